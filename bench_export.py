@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+python bench_export.py [xml_file] [--scale N] [--repeat R]
+Times export_to_excel with each writer backend.
+
+--scale N copies every clashresult N times into a temporary XML (next to the
+original, so image hrefs still resolve) to simulate a large federated report.
+"""
+
+import argparse
+import os
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+import tempfile
+import config
+import export_xml_to_excel_v8 as excel_export
+
+
+def make_scaled_xml(xml_path: Path, scale: int) -> Path:
+    tree = ET.parse(xml_path)
+    root = tree.getroot()
+    for results in root.iter("clashresults"):
+        originals = list(results)
+        for n in range(1, scale):
+            for cr in originals:
+                copy = ET.fromstring(ET.tostring(cr))
+                copy.set("guid", f"{cr.get('guid', '')}-{n}")
+                copy.set("name", f"{cr.get('name', '')}_{n}")
+                results.append(copy)
+    fd, tmp = tempfile.mkstemp(suffix=".xml", dir=xml_path.parent)
+    os.close(fd)
+    tree.write(tmp, encoding="utf-8", xml_declaration=True)
+    return Path(tmp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Excel writer backends")
+    parser.add_argument("xml_file", nargs="?", default=config.XML_FILE)
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backends", nargs="+", default=list(excel_export.WRITERS))
+    args = parser.parse_args()
+
+    xml_path = Path(args.xml_file)
+    bench_xml = make_scaled_xml(xml_path, args.scale) if args.scale > 1 else xml_path
+    out_dir = Path(tempfile.mkdtemp())
+    try:
+        for backend in args.backends:
+            times = []
+            for _ in range(args.repeat):
+                out = out_dir / f"bench_{backend}.xlsx"
+                t0 = time.perf_counter()
+                excel_export.export_to_excel(bench_xml, out, backend=backend)
+                times.append(time.perf_counter() - t0)
+            size_kb = out.stat().st_size / 1024
+            print(f"{backend:<11} best {min(times):7.3f}s  mean {sum(times) / len(times):7.3f}s  {size_kb:,.0f} KB")
+    finally:
+        if bench_xml != xml_path:
+            bench_xml.unlink()
+
+
+if __name__ == "__main__":
+    main()
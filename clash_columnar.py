@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+python clash_columnar.py input.xml output.(parquet|arrow|feather|csv) [--where EXPR]
+Clash tables for analytics, straight from the streamed reader.
+
+One pass over clash_reader.iter_clashes fills one column per field. String
+columns are dictionary encoded while they are read: an int32 code per row
+(-1 = missing) plus the distinct values. Each object's smarttags are
+flattened into "item1.<tag>" / "item2.<tag>" columns. No workbook is built
+and no image is opened.
+
+- write_parquet / write_arrow: pyarrow DictionaryArray columns (pyarrow is optional)
+- write_csv: csv module only
+- to_dataframe(xml_path): pandas DataFrame with categorical string columns
+  (pandas is optional)
+Coordinates and distances are in metres (clash_coords.CoordBlock), created
+is the clash's createddate as a timestamp.
+"""
+
+import argparse
+import csv
+from array import array
+from pathlib import Path
+import numpy as np
+from clash_reader import iter_clashes, object_key, top_k_clashes
+from clash_coords import CoordBlock, _parse
+from clash_timeline import created_array
+from clash_core import add_report_arguments
+
+RECORD_COLUMNS = ["report", "test", "group", "kind", "name", "guid", "status", "href"]
+OBJECT_COLUMNS = ["item1_key", "item2_key"]          # clash_reader.object_key of each object
+STRING_COLUMNS = RECORD_COLUMNS + OBJECT_COLUMNS
+FLOAT_COLUMNS = ["distance", "x", "y", "z"]
+# Output suffix -> writer name
+FORMATS = {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow", ".csv": "csv"}
+
+
+class DictColumn:
+    """Dictionary-encoded string column filled row by row (rows never set stay missing)."""
+
+    def __init__(self):
+        self.index = {}
+        self.values = []
+        self.rows = array("i")
+        self.codes = array("i")
+
+    def set(self, row, value):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        self.rows.append(row)
+        self.codes.append(code)
+
+    def finish(self, n):
+        """int32 codes for n rows, -1 where the row has no value."""
+        codes = np.full(n, -1, dtype=np.int32)
+        codes[np.frombuffer(self.rows, dtype=np.int32)] = np.frombuffer(self.codes, dtype=np.int32)
+        return codes
+
+
+class ClashColumns:
+    def __init__(self):
+        self.n = 0
+        self.units = None
+        self.strings = {name: DictColumn() for name in STRING_COLUMNS}
+        self.tags = {}              # column name -> DictColumn, in order of first appearance
+        self.points = []
+        self.distances = []
+        self.created = []
+
+    def add(self, rec, report=""):
+        row = self.n
+        if self.units is None:
+            self.units = rec["units"]
+        values = [report, rec["test"], rec["group"], rec["kind"], rec["name"], rec["guid"], rec["status"],
+                  rec["href"]]
+        objs = rec["objects"][:2]
+        values += [object_key(obj) for obj in objs] + [None] * (2 - len(objs))
+        for name, value in zip(STRING_COLUMNS, values):
+            if value is not None:
+                self.strings[name].set(row, value)
+        for k, obj in enumerate(objs, start=1):
+            for tag, value in obj["tags"].items():
+                column = self.tags.get(f"item{k}.{tag}")
+                if column is None:
+                    column = self.tags[f"item{k}.{tag}"] = DictColumn()
+                column.set(row, value)
+        self.points.append(rec["point"] or (np.nan, np.nan, np.nan))
+        self.distances.append(rec["distance"])
+        self.created.append(rec["created"])
+        self.n += 1
+
+    def columns(self):
+        """[(name, kind, data)]: kind "dict" -> (int32 codes, values), "float" -> array, "time" -> datetime64[s]."""
+        block = CoordBlock(np.array(self.points, dtype=float).reshape(-1, 3), _parse(self.distances),
+                           units=self.units or "m")
+        floats = dict(zip(FLOAT_COLUMNS, [block.distance, *block.xyz.T]))
+        created = created_array([{"created": c} for c in self.created])
+        object_cols = [(name, self.strings[name]) for name in OBJECT_COLUMNS] + list(self.tags.items())
+        out = [(name, "dict", (self.strings[name].finish(self.n), self.strings[name].values))
+               for name in RECORD_COLUMNS]
+        out += [(name, "float", floats[name]) for name in FLOAT_COLUMNS]
+        out += [("created", "time", created)]
+        out += [(name, "dict", (col.finish(self.n), col.values)) for name, col in object_cols]
+        return out
+
+
+def read_columns(xml_path, where=None, top_k=None, per_test=False):
+    """ClashColumns of one report, streamed."""
+    table = ClashColumns()
+    report = Path(xml_path).stem
+    clashes = iter_clashes(xml_path, where)
+    if top_k is not None:
+        clashes = top_k_clashes(clashes, top_k, per_test=per_test)
+    for rec in clashes:
+        table.add(rec, report)
+    return table
+
+# ---------- Writers ----------
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Parquet / Arrow export needs 'pip install pyarrow'")
+    return pyarrow
+
+
+def to_arrow(table):
+    """pyarrow.Table with dictionary<int32, string> string columns."""
+    pa = _pyarrow()
+    arrays, names = [], []
+    for name, kind, data in table.columns():
+        if kind == "dict":
+            codes, values = data
+            array_ = pa.DictionaryArray.from_arrays(pa.array(codes, mask=codes < 0),
+                                                    pa.array(values, type=pa.string()))
+        elif kind == "float":
+            array_ = pa.array(data, mask=np.isnan(data))
+        else:
+            array_ = pa.array(data, mask=np.isnat(data))
+        arrays.append(array_)
+        names.append(name)
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def write_parquet(table, output_file):
+    _pyarrow()
+    import pyarrow.parquet as pq
+    pq.write_table(to_arrow(table), str(output_file))
+
+
+def write_arrow(table, output_file):
+    """Arrow IPC file (Feather v2)."""
+    pa = _pyarrow()
+    arrow_table = to_arrow(table)
+    with pa.OSFile(str(output_file), "wb") as sink, pa.ipc.new_file(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+
+
+def write_csv(table, output_file):
+    names, cells = [], []
+    for name, kind, data in table.columns():
+        names.append(name)
+        if kind == "dict":
+            codes, values = data
+            cells.append(np.array(values + [""], dtype=object)[codes])      # code -1 -> ""
+        elif kind == "float":
+            cells.append(np.where(np.isnan(data), "", data.astype(str)))
+        else:
+            cells.append(np.where(np.isnat(data), "", np.datetime_as_string(data)))
+    with open(output_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        writer.writerows(zip(*cells))
+
+
+WRITERS = {"parquet": write_parquet, "arrow": write_arrow, "csv": write_csv}
+
+
+def to_dataframe(xml_path, where=None):
+    """pandas DataFrame of a report's clashes; string columns are categoricals."""
+    try:
+        import pandas as pd
+    except ImportError:
+        raise ImportError("to_dataframe needs 'pip install pandas'")
+    table = read_columns(xml_path, where)
+    data = {}
+    for name, kind, values in table.columns():
+        if kind == "dict":
+            codes, categories = values
+            data[name] = pd.Categorical.from_codes(codes, categories=categories)
+        else:
+            data[name] = values
+    return pd.DataFrame(data)
+
+
+def export_columnar(xml_file, output_file, where=None, top_k=None, per_test=False):
+    output_file = Path(output_file)
+    fmt = FORMATS.get(output_file.suffix.lower())
+    if fmt is None:
+        raise ValueError(f"Unknown columnar format '{output_file.suffix}' (choose from {', '.join(FORMATS)})")
+    table = read_columns(xml_file, where, top_k, per_test)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    WRITERS[fmt](table, output_file)
+    print(f"Saved: {output_file} ({table.n} clashes, {len(table.tags)} smarttag columns)")
+    return output_file
+
+
+def plan_columnar(xml_path, output_path, where=None, top_k=None, per_test=False, **_):
+    """clash_core streaming renderer plugin: the worker streams the XML itself."""
+    return [(export_columnar, (xml_path, output_path, where, top_k, per_test))], lambda: None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write clash records to Parquet, Arrow IPC or CSV")
+    parser.add_argument("xml_file")
+    parser.add_argument("output_file", help=f"output file ({', '.join(FORMATS)})")
+    add_report_arguments(parser, records=False)
+    args = parser.parse_args()
+    export_columnar(args.xml_file, args.output_file, args.where, args.top_k, args.per_test)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+clash_coords.py
+All clash positions and distances of a report as one NumPy block.
+
+The pos3f x/y/z and distance attributes are gathered as strings, parsed in
+one array conversion and converted from the report's `units` to metres.
+Rounding, the 3 dp display text, per-test bounding boxes and distance
+statistics are whole-array operations on that block; the exporters read
+each row's point and text from it instead of formatting floats per clash.
+
+Usage:
+    python clash_coords.py path/to/input.xml      # print per-test extents
+"""
+
+import sys
+import xml.etree.ElementTree as ET
+import numpy as np
+from clash_reader import UNIT_SCALE
+
+DECIMALS = 3
+EXTENT_HEADERS = ["Test Name", "Clashes", "Min X", "Min Y", "Min Z", "Max X", "Max Y", "Max Z",
+                  "Min Distance", "Mean Distance", "Median Distance", "Max Distance"]
+
+
+def report_units(root):
+    """Length units of the report (batchtest, else exchange attribute; metres if absent)."""
+    batch = root.find("batchtest")
+    units = (batch.get("units") if batch is not None else None) or root.get("units") or "m"
+    return units.strip().lower()
+
+
+def _parse(values):
+    """Strings -> float array; "" and unparsable values become NaN."""
+    try:
+        return np.array([v or "nan" for v in values], dtype=float)
+    except ValueError:
+        out = np.full(len(values), np.nan)
+        for n, v in enumerate(values):
+            try:
+                out[n] = float(v)
+            except (TypeError, ValueError):
+                pass
+        return out
+
+
+class CoordBlock:
+    """Points (n, 3) in metres rounded to DECIMALS, distances (n,) in metres, and the test of each row.
+
+    Distances are not rounded (penetrations below a millimetre are common);
+    their text is the report's own value when no unit conversion is needed.
+    """
+
+    def __init__(self, xyz, distance, tests=None, units="m", distance_text=None):
+        if units not in UNIT_SCALE:
+            print(f"Unknown units '{units}'; coordinates left unconverted")
+        scale = UNIT_SCALE.get(units, 1.0)
+        self.units = units
+        self.xyz = np.round(np.asarray(xyz, dtype=float).reshape(-1, 3) * scale, DECIMALS)
+        self.distance = np.asarray(distance, dtype=float) * scale
+        self.has_point = ~np.isnan(self.xyz).any(axis=1)
+        self.tests = list(tests) if tests is not None else [""] * len(self.xyz)
+
+        # Display text for every value at once
+        self.xyz_text = np.char.mod(f"%.{DECIMALS}f", self.xyz)
+        if distance_text is None or scale != 1.0:
+            distance_text = np.char.mod("%.6g", self.distance)
+        self.distance_text = np.where(np.isnan(self.distance), "N/A", distance_text)
+
+    @classmethod
+    def from_elements(cls, clashes, tests=None, units="m"):
+        """Block for a list of clashresult/clashgroup elements."""
+        xs, ys, zs, dists = [], [], [], []
+        for clash in clashes:
+            pos = clash.find(".//pos3f")
+            x = y = z = ""
+            if pos is not None:
+                x, y, z = (pos.get(axis) or "0" for axis in "xyz")
+            xs.append(x)
+            ys.append(y)
+            zs.append(z)
+            dists.append(clash.get("distance", ""))
+        xyz = np.column_stack([_parse(xs), _parse(ys), _parse(zs)]) if clashes else np.empty((0, 3))
+        return cls(xyz, _parse(dists), tests, units, np.array(dists, dtype=str))
+
+    @classmethod
+    def from_records(cls, records, units="m"):
+        """Block for clash_reader records (points already parsed, distances as strings)."""
+        points = [rec["point"] or (np.nan, np.nan, np.nan) for rec in records]
+        dists = [rec["distance"] for rec in records]
+        xyz = np.array(points, dtype=float).reshape(-1, 3)
+        return cls(xyz, _parse(dists), [rec["test"] for rec in records], units, np.array(dists, dtype=str))
+
+    def __len__(self):
+        return len(self.xyz)
+
+    def take(self, rows):
+        """Block with only the given rows (already in metres)."""
+        rows = np.asarray(rows, dtype=int)
+        return CoordBlock(self.xyz[rows], self.distance[rows], [self.tests[n] for n in rows.tolist()],
+                          distance_text=self.distance_text[rows])
+
+    def points(self):
+        """Per-row (x, y, z) tuples, or None where the clash has no point."""
+        return [tuple(p) if ok else None for p, ok in zip(self.xyz.tolist(), self.has_point.tolist())]
+
+    def coords_text(self, sep=", "):
+        """Per-row "x m<sep>y m<sep>z m" text ("" where the clash has no point)."""
+        xyz = self.xyz_text
+        joined = np.char.add(np.char.add(np.char.add(xyz[:, 0], "m" + sep), np.char.add(xyz[:, 1], "m" + sep)),
+                             np.char.add(xyz[:, 2], "m")) if len(xyz) else np.empty(0, dtype=str)
+        return np.where(self.has_point, joined, "").tolist()
+
+    def test_extents(self):
+        """One EXTENT_HEADERS row per test: bounding box and distance statistics."""
+        if not len(self):
+            return []
+        names, codes = np.unique(np.asarray(self.tests, dtype=object).astype(str), return_inverse=True)
+        order = np.argsort(codes, kind="stable")
+        starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+        xyz = self.xyz[order]
+        dist = self.distance[order]
+
+        lo = np.fmin.reduceat(xyz, starts, axis=0)     # fmin/fmax skip NaN
+        hi = np.fmax.reduceat(xyz, starts, axis=0)
+        counts = np.diff(np.r_[starts, len(order)])
+        valid = ~np.isnan(dist)
+        n_dist = np.add.reduceat(valid.astype(int), starts)
+        d_min = np.fmin.reduceat(dist, starts)
+        d_max = np.fmax.reduceat(dist, starts)
+        d_sum = np.add.reduceat(np.where(valid, dist, 0.0), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            d_mean = d_sum / n_dist
+        rows = []
+        for g, name in enumerate(names):
+            seg = dist[starts[g]:starts[g] + counts[g]]
+            median = np.median(seg[~np.isnan(seg)]) if n_dist[g] else np.nan
+            rows.append([str(name), int(counts[g]), *_cells(lo[g]), *_cells(hi[g]),
+                         *_cells([d_min[g], d_mean[g], median, d_max[g]])])
+        return rows
+
+
+def _cells(values):
+    """Floats for sheet cells: rounded, NaN -> None."""
+    return [None if np.isnan(v) else round(float(v), DECIMALS) for v in values]
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python clash_coords.py path/to/input.xml")
+        sys.exit(1)
+    root = ET.parse(sys.argv[1]).getroot()
+    clashes = root.findall(".//clashresult") or root.findall(".//clashgroup")
+    tests = {}
+    for test in root.iter("clashtest"):
+        for elem in test.iter():
+            tests.setdefault(id(elem), test.get("name"))
+    block = CoordBlock.from_elements(clashes, [tests.get(id(c)) or "Unknown Test" for c in clashes],
+                                     report_units(root))
+    print(f"{len(block)} clashes, units: {block.units}")
+    print("\t".join(EXTENT_HEADERS))
+    for row in block.test_extents():
+        print("\t".join("" if v is None else str(v) for v in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+python clash_core.py input.xml output.xlsx [output.docx ...] [--workers N] [options]
+Shared core of the clash exporters.
+
+- Item text: get_item_details / get_item_name_short (one copy for every format).
+- Image pipeline: find_image_file looks images up in cached directory
+  listings instead of probing the file system per candidate path
+  (image_stamp gives a file's size and mtime from the same listing);
+  resize_image decodes JPEGs at reduced scale (draft mode) and keeps the
+  latest thumbnails in memory, so exporting the same report again (e.g. to
+  another format from the GUI) does not resize anything.
+- Record model: collect_clash_records turns clash_reader records into one
+  row dict per clash (item texts, details, image file, coordinate block,
+  summary counts); dedupe_records, apply_rfi_register and the proximity
+  clusters (assign_clusters / add_nearby_clashes) work on those rows.
+- Reports: load_report parses a report once into that model: filtered,
+  numbered, optionally deduplicated and registered. It does nothing
+  format-specific; each renderer adds what only it needs (e.g. Excel its
+  clusters, timeline and thumbnails, via prepare_thumbnails at its own
+  image size).
+- Renderers: RENDERERS maps an output suffix to a "module:function" plugin,
+  imported on first use. A plugin is called as plan(report, output_path,
+  **options) and returns (jobs, finish): jobs are (function, args) tuples of
+  module-level functions, run in worker processes, and finish() runs in the
+  parent once all jobs are done (e.g. to write an index). STREAM_RENDERERS
+  plugins (Parquet / Arrow / CSV / NDJSON) get plan(xml_path, output_path, **options)
+  and stream the XML in their own job; an export made only of those never
+  builds records or opens an image.
+
+export() renders any number of outputs from one load_report, all jobs in
+one process pool; the exporters' export_to_excel / export_to_word and the
+GUI go through it.
+"""
+
+import argparse
+import importlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from PIL import Image as PILImage
+from clash_reader import as_filter, iter_clashes, pair_key, positive_int, top_k_clashes
+from clash_coords import CoordBlock
+from clash_summary import ClashSummary
+from rfi_register import RfiRegister, report_date
+
+# Output suffix -> "module:function" renderer plugin
+RENDERERS = {
+    ".xlsx": "export_xml_to_excel_v8:plan_excel",
+    ".docx": "export_xml_to_word_v4:plan_word",
+}
+# Plugins that stream the XML themselves (no records, no images): called with the XML path instead of a report
+STREAM_RENDERERS = {
+    ".parquet": "clash_columnar:plan_columnar",
+    ".arrow": "clash_columnar:plan_columnar",
+    ".feather": "clash_columnar:plan_columnar",
+    ".csv": "clash_columnar:plan_columnar",
+    ".ndjson": "clash_ndjson:plan_ndjson",
+    ".jsonl": "clash_ndjson:plan_ndjson",
+}
+# export() options consumed by load_report; the rest go to the renderers
+RECORD_OPTIONS = ("where", "top_k", "per_test", "dedupe", "register")
+NEARBY_LIMIT = 5                 # most nearby clashes listed per row
+THUMBNAIL_CACHE_SIZE = 1024      # thumbnails kept in memory (a few tens of KB each)
+CASE_INSENSITIVE_FS = os.name == "nt"
+
+# ---------- Item text ----------
+def get_item_details(tags):
+    """Item text for one clash object from its smarttags ({name: value})."""
+    lines = []
+    if tags.get("Item Name"):
+        lines.append(f"Item Name: {tags.get('Item Name')}")
+    if tags.get("Civil3D General:Network name"):
+        lines.append(f"Network: {tags.get('Civil3D General:Network name')}")
+    part = tags.get("Civil3D General:Part Size Name", "")
+    itype = tags.get("Item Type", "")
+    type_line = " ".join(filter(None, [part, itype])).strip()
+    if type_line:
+        lines.append(f"Item Type: {type_line}")
+    inner = tags.get("Civil3D General:Inner Diameter or Width", "")
+    outer = tags.get("Civil3D General:Outer Diameter or Width", "")
+    if inner or outer:
+        lines.append(f"Pipe {inner} x {outer}".strip())
+    return "\n".join(lines)
+
+def get_item_name_short(item_details_text):
+    for line in item_details_text.splitlines():
+        if line.startswith("Item Name:"):
+            return line.replace("Item Name:", "").strip()
+    first = item_details_text.splitlines()[0] if item_details_text else ""
+    return first or "Unknown"
+
+# ---------- Image pipeline ----------
+def _name_key(name):
+    return name.casefold() if CASE_INSENSITIVE_FS else name
+
+@lru_cache(maxsize=256)
+def _listing(folder, mtime_ns):
+    """{name key: os.DirEntry} of one folder (cached per modification time)."""
+    try:
+        with os.scandir(folder) as entries:
+            return {_name_key(e.name): e for e in entries}
+    except OSError:
+        return {}
+
+def _folder_listing(folder):
+    try:
+        mtime_ns = os.stat(folder).st_mtime_ns
+    except OSError:
+        return {}
+    return _listing(str(folder), mtime_ns)
+
+def find_image_file(href_raw: str, xml_path: Path):
+    """Image file of a clash href: as given, next to the XML, or in its ELV_files folder."""
+    if not href_raw:
+        return None
+    href = href_raw.replace("\\", "/").strip()
+    candidates = []
+    p = Path(href)
+    if p.is_absolute():
+        candidates.append(p)
+    xml_dir = Path(xml_path).parent
+    candidates.append(xml_dir / href)
+    fname = Path(href).name
+    candidates.append(xml_dir / fname)
+    candidates.append(xml_dir / "ELV_files" / fname)
+    for cand in candidates:
+        entry = _folder_listing(cand.parent).get(_name_key(cand.name))
+        if entry is not None:
+            found = cand.parent / entry.name
+            try:
+                return found.resolve()
+            except Exception:
+                return found
+    return None
+
+def image_stamp(img_path: Path):
+    """(size, mtime_ns) of an image file from its folder's cached listing, without reading the file."""
+    img_path = Path(img_path)
+    entry = _folder_listing(img_path.parent).get(_name_key(img_path.name))
+    try:
+        st = entry.stat()
+    except (AttributeError, OSError):
+        return None
+    return st.st_size, st.st_mtime_ns
+
+@lru_cache(maxsize=THUMBNAIL_CACHE_SIZE)
+def _thumbnail(path, mtime_ns, size, max_w, max_h, fmt):
+    img = PILImage.open(path)
+    fmt = fmt or img.format or "PNG"
+    w, h = img.size
+    ratio = min(max_w / w, max_h / h, 1.0)
+    new_w, new_h = int(w * ratio), int(h * ratio)
+    # JPEGs decode straight to the nearest larger 1/2, 1/4 or 1/8 scale
+    img.draft(img.mode, (new_w, new_h))
+    img = img.resize((new_w, new_h), PILImage.LANCZOS)
+    buf = BytesIO()
+    # Fixed 96 dpi so every renderer places the thumbnail at its pixel size
+    img.save(buf, format=fmt, dpi=(96, 96))
+    return buf.getvalue()
+
+def resize_image(orig_path: Path, max_w_px: int, max_h_px: int, fmt=None):
+    """Thumbnail bytes fitting max_w_px x max_h_px (same format as the original unless fmt is given)."""
+    try:
+        st = os.stat(orig_path)
+        return _thumbnail(str(orig_path), st.st_mtime_ns, st.st_size, max(1, int(max_w_px)), max(1, int(max_h_px)),
+                          fmt)
+    except Exception as e:
+        print(f"Could not open image {orig_path}: {e}")
+        return None
+
+def prepare_thumbnails(img_paths, max_w_px, max_h_px, fmt=None, ready=None):
+    """Thumbnail bytes per image path (None without one) at the renderer's own geometry.
+
+    ready[n], where given, is used instead of resizing (e.g. a thumbnail
+    reused from a previous export).
+    """
+    ready = ready or [None] * len(img_paths)
+    return [done or (resize_image(path, max_w_px, max_h_px, fmt) if path else None)
+            for path, done in zip(img_paths, ready)]
+
+def clear_caches():
+    _listing.cache_clear()
+    _thumbnail.cache_clear()
+
+# ---------- Record model ----------
+def collect_clash_records(clashes, xml_path: Path):
+    """Turn clash_reader records into one dict per output row (shared by every renderer).
+
+    Returns (records, block, summary): block is the report's CoordBlock
+    (points and distances in metres), rec["row"] is the record's row in it,
+    and summary the ClashSummary counted in the same loop.
+    """
+    block = CoordBlock.from_records(clashes, clashes[0]["units"] if clashes else "m")
+    points = block.points()
+    coords_texts = block.coords_text(sep=",\n")
+    distance_texts = block.distance_text.tolist()
+    distances = [None if d != d else d for d in block.distance.tolist()]   # NaN -> None
+    summary = ClashSummary(report=xml_path.stem)
+
+    records = []
+    for i, clash in enumerate(clashes, start=1):
+        row = i - 1
+        test_name = clash["test"]
+        group_name = (clash["name"] or "None") if clash["kind"] == "group" else "None"
+        clash_group = f"{group_name}, {test_name}" if group_name != "None" else test_name
+
+        # ---------- Clash details ----------
+        clash_name = clash["name"] or f"Clash{i}"
+        distance = clash["distance"] or "N/A"
+
+        objs = clash["objects"]
+        item1_text = get_item_details(objs[0]["tags"]) if len(objs) > 0 else ""
+        item2_text = get_item_details(objs[1]["tags"]) if len(objs) > 1 else ""
+        item2_name = get_item_name_short(item2_text)
+
+        between_line = f"Between: {get_item_name_short(item1_text)} and {item2_name}\n"
+        clash_details = (
+            f"Clash Group: {clash_group}\n"
+            f"{between_line}\n"
+            f"{clash_name}\n"
+            f"Distance: {distance_texts[row]}m\n"
+            f"Clash Point:\n{coords_texts[row]}"
+        )
+
+        summary.add(test_name, clash["group"] or (clash["name"] if clash["kind"] == "group" else ""),
+                    clash["status"], objs, distances[row])
+
+        href_raw = clash["href"]
+        records.append({
+            "rfi_no": i,
+            "guid": clash["guid"],
+            "status": clash["status"],
+            "distance": distance,
+            "test_name": test_name,
+            "group_name": group_name,
+            "clash_details": clash_details,
+            "item1": item1_text,
+            "item2": item2_text,
+            "item2_name": item2_name,
+            "href": href_raw,
+            "img_path": find_image_file(href_raw, xml_path),
+            "clash_name": clash_name,
+            "point": points[row],
+            "row": row,
+            "pair": pair_key(objs),
+        })
+    return records, block, summary
+
+def dedupe_records(records):
+    """Collapse clashes between the same two objects (e.g. one clash per test) into one row.
+
+    The first clash of each object pair is kept; its Test Name lists every
+    test the pair clashes in and its details name the collapsed clashes.
+    Rows are renumbered 1..N.
+    """
+    kept = {}
+    out = []
+    saved_rows = saved_images = 0
+    for rec in records:
+        first = kept.get(rec["pair"]) if rec["pair"] else None
+        if first is None:
+            if rec["pair"]:
+                kept[rec["pair"]] = rec
+            rec["tests"] = [rec["test_name"]]
+            out.append(rec)
+            continue
+        if rec["test_name"] not in first["tests"]:
+            first["tests"].append(rec["test_name"])
+        first["clash_details"] += f"\nAlso in: {rec['test_name']} ({rec['clash_name']})"
+        saved_rows += 1
+        saved_images += rec["img_path"] is not None
+
+    for i, rec in enumerate(out, start=1):
+        rec["rfi_no"] = i
+        rec["test_name"] = ", ".join(rec.pop("tests"))
+    print(f"Dedup: {len(records)} clashes -> {len(out)} rows "
+          f"({saved_rows} duplicate rows and {saved_images} images saved)")
+    return out
+
+def register_key(rec):
+    """Register key of a row: its clash guid, else test + clash name (stable across Navisworks runs)."""
+    return rec["guid"] or f"{rec['test_name']}|{rec['clash_name']}"
+
+def apply_rfi_register(records, register_path, xml_path: Path):
+    """Replace positional RFI numbers with the project's permanent ones (looked up in bulk)."""
+    keys = [register_key(rec) for rec in records]
+    with RfiRegister(register_path) as reg:
+        numbers = reg.assign(keys, report_date(xml_path))
+    for rec, key in zip(records, keys):
+        rec["rfi_no"] = numbers[key]
+    return records
+
+# ---------- Proximity clusters ----------
+def assign_clusters(records, radius):
+    """Set rec["cluster"]: clashes chained within radius of each other share a number.
+
+    Clusters of two or more clashes are numbered 1..K, largest first; lone
+    clashes (and clashes without a point) get None.
+    """
+    try:
+        from clash_spatial import cluster_points
+    except ImportError:
+        raise ImportError("Clash clustering needs 'pip install numpy'")
+    labels = cluster_points([rec["point"] for rec in records], radius)
+    members = {}
+    for n, label in enumerate(labels.tolist()):
+        if label >= 0:
+            members.setdefault(label, []).append(n)
+    groups = sorted((m for m in members.values() if len(m) > 1), key=lambda m: (-len(m), m[0]))
+    for rec in records:
+        rec["cluster"] = None
+    for number, group in enumerate(groups, start=1):
+        for n in group:
+            records[n]["cluster"] = number
+    print(f"Clusters: {len(groups)} groups of nearby clashes within {radius}m "
+          f"({sum(len(g) for g in groups)} of {len(records)} clashes)")
+    return records
+
+def add_nearby_clashes(records, radius, limit=NEARBY_LIMIT):
+    """Set rec["nearby"]: the RFI numbers of up to `limit` clashes within radius, nearest first."""
+    try:
+        from clash_spatial import GridIndex
+    except ImportError:
+        raise ImportError("Nearby clashes need 'pip install numpy'")
+    index = GridIndex([rec["point"] for rec in records], radius)
+    i, j = index.pairs_within(radius)
+    dist = ((index.points[i] - index.points[j]) ** 2).sum(axis=1) ** 0.5
+    near = {}
+    for a, b, d in zip(i.tolist(), j.tolist(), dist.tolist()):
+        near.setdefault(a, []).append((d, b))
+        near.setdefault(b, []).append((d, a))
+    for n, rec in enumerate(records):
+        found = sorted(near.get(n, ()))[:limit]
+        rec["nearby"] = ", ".join(f"{records[m]['rfi_no']} ({d:.1f}m)" for d, m in found)
+    return records
+
+# ---------- Reports ----------
+def load_report(xml_path, where=None, top_k=None, per_test=False, dedupe=None, register=None):
+    """Records of one report plus what every renderer shares (a plain dict).
+
+    Keys: xml_path, name, records (numbered row dicts), block (CoordBlock,
+    row n is records[n]), summary (ClashSummary) and summary_rows, and
+    clashes (the clash_reader records of every clash, before dedupe).
+    Format-specific work (clusters, thumbnails, timeline, ...) is left to
+    the renderer plugins. Options default to the config.py settings.
+    """
+    import config      # not at module level: streaming renderers import this module and write to stdout
+    _listing.cache_clear()      # fresh folder listings (and image stamps) for every report
+    xml_path = Path(xml_path)
+    where = as_filter(where or getattr(config, "CLASH_FILTER", None))
+    clashes = iter_clashes(xml_path, where)
+    if top_k is not None:
+        clashes = top_k_clashes(clashes, top_k, per_test=per_test)
+    clashes = list(clashes)
+    records, block, summary = collect_clash_records(clashes, xml_path)
+    if where is not None:
+        print(f"Filter: {where.kept} of {where.seen} clashes kept")
+    summary_rows = summary.rows(block.distance)
+    if dedupe if dedupe is not None else getattr(config, "DEDUPE_ACROSS_TESTS", False):
+        records = dedupe_records(records)
+        block = block.take([rec["row"] for rec in records])
+    register = register or getattr(config, "RFI_REGISTER", None)
+    if register:
+        apply_rfi_register(records, register, xml_path)
+    return {"xml_path": xml_path, "name": xml_path.stem, "records": records, "block": block, "summary": summary,
+            "summary_rows": summary_rows, "clashes": clashes}
+
+# ---------- Renderers ----------
+def register_renderer(suffix, target, streaming=False):
+    """Add or replace the renderer plugin ("module:function") for an output suffix."""
+    (STREAM_RENDERERS if streaming else RENDERERS)[suffix.lower()] = target
+    (RENDERERS if streaming else STREAM_RENDERERS).pop(suffix.lower(), None)
+
+def renderer_for(output_path):
+    """-> (plan function, streaming?) for an output file."""
+    suffix = Path(output_path).suffix.lower()
+    streaming = suffix in STREAM_RENDERERS
+    target = STREAM_RENDERERS.get(suffix) or RENDERERS.get(suffix)
+    if target is None:
+        raise ValueError(f"No renderer for '{suffix}' files (available: {', '.join([*RENDERERS, *STREAM_RENDERERS])})")
+    module_name, func_name = target.split(":")
+    return getattr(importlib.import_module(module_name), func_name), streaming
+
+def run_jobs(jobs, workers=None):
+    """Run (function, args) jobs, in worker processes when there is more than one CPU and job."""
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        return [func(*args) for func, args in jobs]
+    print(f"Rendering {len(jobs)} file(s) with {workers} worker processes")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(func, *args) for func, args in jobs]
+        return [future.result() for future in futures]
+
+def export(xml_file, output_files, workers=None, **options):
+    """Render every output file (format by suffix) from one parse of xml_file.
+
+    where defaults to config.CLASH_FILTER for every output, streamed or not.
+    """
+    xml_path = Path(xml_file)
+    if not xml_path.exists():
+        print(f"XML file not found: {xml_file}")
+        return
+    outputs = [Path(f) for f in ([output_files] if isinstance(output_files, (str, Path)) else output_files)]
+    plans = [(out, *renderer_for(out)) for out in outputs]
+    # One filter for every format: streaming plugins read the XML themselves
+    import config
+    options["where"] = options.get("where") or getattr(config, "CLASH_FILTER", None)
+    record_options = {k: v for k, v in options.items() if k in RECORD_OPTIONS}
+    render_options = {k: v for k, v in options.items() if k not in RECORD_OPTIONS}
+
+    # Records only when a non-streaming format asks for them
+    report = None
+    if not all(streaming for _, _, streaming in plans):
+        report = load_report(xml_path, **record_options)
+    jobs, finishers = [], []
+    for out, plan, streaming in plans:
+        out.parent.mkdir(parents=True, exist_ok=True)
+        if streaming:
+            out_jobs, finish = plan(xml_path, out, **options)
+        else:
+            out_jobs, finish = plan(report, out, **render_options)
+        jobs += out_jobs
+        finishers.append(finish)
+    run_jobs(jobs, workers)
+    for finish in finishers:
+        finish()
+    return outputs
+
+# ---------- Command line ----------
+def add_report_arguments(parser, records=True):
+    """--where / --top-k / --per-test, plus --register / --dedupe for load_report renderers (records=True)."""
+    parser.add_argument("--where", help='clash filter, e.g. "status=new,active; test=Storm*; distance<=-0.02"')
+    parser.add_argument("--top-k", type=positive_int, help="only the K most severe clashes")
+    parser.add_argument("--per-test", action="store_true", help="with --top-k: K per clash test")
+    if records:
+        parser.add_argument("--register", help="SQLite RFI register")
+        parser.add_argument("--dedupe", action="store_true", default=None, help="collapse duplicate object pairs")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a Navisworks clash XML to one or more formats in one run")
+    parser.add_argument("xml_file")
+    parser.add_argument("outputs", nargs="+",
+                        help=f"output files; format by suffix ({', '.join([*RENDERERS, *STREAM_RENDERERS])})")
+    parser.add_argument("--workers", type=int, help="render processes (default: CPU count)")
+    parser.add_argument("--backend", help="Excel writer backend (openpyxl / xlsxwriter)")
+    parser.add_argument("--template", help="branded .xlsx template (openpyxl backend)")
+    parser.add_argument("--incremental", action="store_true", help="reuse thumbnails of the existing .xlsx")
+    parser.add_argument("--merge", action="store_true", help="keep User Images / Comments of the existing .xlsx")
+    parser.add_argument("--cluster-radius", type=float, help="Excel proximity clusters (m)")
+    parser.add_argument("--nearby-radius", type=float, help="Excel Nearby Clashes column (m)")
+    parser.add_argument("--split-by", choices=["test"], help="one Word volume per clash test")
+    parser.add_argument("--max-rows", type=int, help="at most this many clashes per Word volume")
+    add_report_arguments(parser)
+    args = parser.parse_args()
+    export(args.xml_file, args.outputs, workers=args.workers, backend=args.backend, template=args.template,
+           incremental=args.incremental, merge=args.merge, cluster_radius=args.cluster_radius,
+           nearby_radius=args.nearby_radius, split_by=args.split_by, max_rows=args.max_rows,
+           register=args.register, dedupe=args.dedupe, where=args.where, top_k=args.top_k, per_test=args.per_test)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+python clash_ndjson.py input.xml [output.ndjson | -] [--where EXPR] [--top-k K [--per-test]]
+Streams a clash report as NDJSON (one JSON object per line, stdout by default).
+
+Each clash is written as soon as clash_reader.iter_clashes has parsed it
+and output is flushed every FLUSH_LINES clashes or FLUSH_SECONDS, so a
+downstream tool sees the first clash long before a large XML has been read.
+Nothing is accumulated (except with --top-k), so memory stays flat.
+
+Object per clash:
+    report, test, group, kind, name, guid, status, href
+    image       resolved image file (clash_core.find_image_file), or null
+    distance    metres (null if missing)
+    point       {"x", "y", "z"} in metres, 3 dp, or null
+    created     ISO 8601 creation time, or null
+    objects     [{"key": object identity, "tags": {smarttag: value}}, ...]
+
+e.g. python clash_ndjson.py report.xml --where "status=new,active" | jq -c 'select(.distance < -0.1)'
+"""
+
+import argparse
+import datetime
+import json
+import math
+import sys
+import time
+from pathlib import Path
+from clash_reader import iter_clashes, object_key, quiet_broken_pipe, top_k_clashes
+from clash_coords import DECIMALS, UNIT_SCALE
+from clash_core import add_report_arguments, find_image_file
+
+FLUSH_LINES = 64
+FLUSH_SECONDS = 0.2
+
+
+def created_iso(created):
+    if created is None:
+        return None
+    try:
+        return datetime.datetime(*(int(float(v)) for v in created)).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def clash_json(rec, report, xml_path):
+    """JSON-ready dict of one clash_reader record."""
+    scale = UNIT_SCALE.get(rec["units"], 1.0)
+    try:
+        distance = float(rec["distance"]) * scale
+    except (TypeError, ValueError):
+        distance = None
+    if distance is not None and not math.isfinite(distance):
+        distance = None             # NaN is not valid JSON
+    point = None
+    if rec["point"]:
+        x, y, z = (round(v * scale, DECIMALS) for v in rec["point"])
+        point = {"x": x, "y": y, "z": z}
+    image = find_image_file(rec["href"], xml_path)
+    return {
+        "report": report,
+        "test": rec["test"],
+        "group": rec["group"],
+        "kind": rec["kind"],
+        "name": rec["name"],
+        "guid": rec["guid"],
+        "status": rec["status"],
+        "href": rec["href"],
+        "image": str(image) if image else None,
+        "distance": distance,
+        "point": point,
+        "created": created_iso(rec["created"]),
+        "objects": [{"key": object_key(obj), "tags": obj["tags"]} for obj in rec["objects"]],
+    }
+
+
+def write_ndjson(xml_path, out, where=None, top_k=None, per_test=False):
+    """Write one line per clash to the text stream out; returns the number of clashes."""
+    xml_path = Path(xml_path)
+    report = xml_path.stem
+    clashes = iter_clashes(xml_path, where)
+    if top_k is not None:
+        clashes = top_k_clashes(clashes, top_k, per_test=per_test)
+    count = pending = 0
+    last_flush = time.monotonic()
+    for rec in clashes:
+        out.write(json.dumps(clash_json(rec, report, xml_path), ensure_ascii=False) + "\n")
+        count += 1
+        pending += 1
+        if count == 1 or pending >= FLUSH_LINES or time.monotonic() - last_flush >= FLUSH_SECONDS:
+            out.flush()
+            pending = 0
+            last_flush = time.monotonic()
+    out.flush()
+    return count
+
+
+def export_ndjson(xml_file, output_file, where=None, top_k=None, per_test=False):
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as f:
+        count = write_ndjson(xml_file, f, where, top_k, per_test)
+    print(f"Saved: {output_file} ({count} clashes)")
+    return output_file
+
+
+def plan_ndjson(xml_path, output_path, where=None, top_k=None, per_test=False, **_):
+    """clash_core streaming renderer plugin for .ndjson / .jsonl files."""
+    return [(export_ndjson, (xml_path, output_path, where, top_k, per_test))], lambda: None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a clash XML as NDJSON")
+    parser.add_argument("xml_file")
+    parser.add_argument("output", nargs="?", default="-", help="output file, or - for stdout (default)")
+    add_report_arguments(parser, records=False)
+    args = parser.parse_args()
+
+    if not Path(args.xml_file).exists():
+        print(f"XML file not found: {args.xml_file}", file=sys.stderr)
+        sys.exit(1)
+    if args.output != "-":
+        export_ndjson(args.xml_file, args.output, args.where, args.top_k, args.per_test)
+        return
+    try:
+        write_ndjson(args.xml_file, sys.stdout, args.where, args.top_k, args.per_test)
+    except BrokenPipeError:
+        quiet_broken_pipe()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+clash_reader.py
+Streaming reader for Navisworks clash XML.
+
+iter_clashes() walks the file with iterparse and yields one plain dict per
+clash as soon as its element is complete, then clears the element and
+detaches it from its parent, so memory stays bounded by one clash (plus the
+clashgroup fallback below) whatever the report size.
+
+Like the exporters, a report is read as its <clashresult> elements; only a
+report without any clashresult falls back to its <clashgroup> elements.
+
+Record keys:
+    kind      "result" or "group"
+    test      clash test name
+    group     enclosing clashgroup name ("" if none)
+    name, guid, status, distance, href   clash attributes (strings)
+    point     (x, y, z) floats, or None
+    created   (year, month, day, hour, minute, second) attribute strings, or None
+              (left unparsed: clash_timeline converts a whole report at once)
+    objects   [{"attributes": {...}, "tags": {...}}, ...] per clashobject
+    units     length units of the report ("m" if not stated)
+
+top_k_clashes() keeps only the K most severe clashes of such a stream.
+
+Filters (iter_clashes(path, where=...)) are evaluated inside the reader:
+status / test / group / distance are checked on the element's attributes
+before any record is built, smarttags right after, so excluded clashes
+never reach the exporters. Expression syntax, clauses joined by ";":
+    status=new,active           test=Storm,ELV*        group=1.Move*
+    distance<=-0.05             distance>-0.5      (metres, whatever the report's units)
+    tag:Item Type=Pipe          (any clash object's smarttag; * and ? wildcards)
+e.g. "status=new,active; test=Storm*; distance<=-0.02"
+
+Usage:
+    python clash_reader.py path/to/input.xml      # print one line per clash
+"""
+
+import argparse
+import fnmatch
+import heapq
+import math
+import operator
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+DATE_FIELDS = ("year", "month", "day", "hour", "minute", "second")
+# Navisworks export units -> metres
+UNIT_SCALE = {
+    "m": 1.0, "cm": 0.01, "mm": 0.001, "um": 1e-6, "km": 1000.0,
+    "ft": 0.3048, "in": 0.0254, "yd": 0.9144, "mi": 1609.344,
+}
+DISTANCE_OPS = {"<=": operator.le, ">=": operator.ge, "<": operator.lt, ">": operator.gt, "=": operator.eq}
+
+
+def _name_values(elem, tag):
+    out = {}
+    for item in elem.iter(tag):
+        name = (item.findtext("name") or "").strip()
+        if name:
+            out[name] = (item.findtext("value") or "").strip()
+    return out
+
+
+def clash_record(elem, kind, test_name, group_name, units="m"):
+    """Flatten one clashresult/clashgroup element into a record dict."""
+    point = None
+    pos = elem.find("clashpoint/pos3f")
+    if pos is not None:
+        try:
+            point = (float(pos.get("x") or 0.0), float(pos.get("y") or 0.0), float(pos.get("z") or 0.0))
+        except ValueError:
+            point = None
+
+    date = elem.find("createddate/date")
+    created = tuple(date.get(f) or "0" for f in DATE_FIELDS) if date is not None else None
+
+    return {
+        "kind": kind,
+        "test": test_name,
+        "group": group_name,
+        "name": elem.get("name", ""),
+        "guid": elem.get("guid", ""),
+        "status": elem.get("status", ""),
+        "distance": elem.get("distance", ""),
+        "href": elem.get("href") or "",
+        "point": point,
+        "created": created,
+        "objects": clash_objects(elem),
+        "units": units,
+    }
+
+
+def clash_objects(elem):
+    """[{"attributes": {...}, "tags": {...}}, ...] for the clashobjects of one clash element."""
+    return [{"attributes": _name_values(obj, "objectattribute"), "tags": _name_values(obj, "smarttag")}
+            for obj in elem.findall("clashobjects/clashobject")]
+
+
+class ClashFilter:
+    """Clash predicate; see the module docstring for the expression syntax.
+
+    seen / kept count the clashes tested and accepted by the latest
+    iter_clashes pass (reset when it starts, so a filter can be reused).
+    """
+
+    def __init__(self, statuses=None, tests=None, groups=None, distance=(), tags=None):
+        self.statuses = {s.lower() for s in statuses} if statuses else None
+        self.tests = [t.lower() for t in tests] if tests else None
+        self.groups = [g.lower() for g in groups] if groups else None
+        self.distance = list(distance)          # [(op, value), ...]
+        self.tags = {name: [v.lower() for v in values] for name, values in (tags or {}).items()}
+        self.seen = 0
+        self.kept = 0
+
+    @classmethod
+    def parse(cls, expr):
+        statuses, tests, groups, distance, tags = None, None, None, [], {}
+        for clause in filter(None, (c.strip() for c in expr.split(";"))):
+            m = re.fullmatch(r"distance\s*(<=|>=|<|>|=)\s*(\S+)", clause, re.IGNORECASE)
+            if m:
+                distance.append((m.group(1), float(m.group(2))))
+                continue
+            key, sep, value = clause.partition("=")
+            values = [v.strip() for v in value.split(",") if v.strip()]
+            key = key.strip()
+            if not sep or not values:
+                raise ValueError(f"Bad filter clause: {clause!r}")
+            if key.lower() == "status":
+                statuses = values
+            elif key.lower() == "test":
+                tests = values
+            elif key.lower() == "group":
+                groups = values
+            elif key.lower().startswith("tag:"):
+                tags[key[4:].strip()] = values
+            else:
+                raise ValueError(f"Unknown filter field {key!r} (status, test, group, distance, tag:<name>)")
+        return cls(statuses, tests, groups, distance, tags)
+
+    @staticmethod
+    def _match(value, patterns):
+        value = (value or "").lower()
+        return any(fnmatch.fnmatchcase(value, p) for p in patterns)
+
+    def accepts(self, test, group, status, distance, scale=1.0):
+        """Attribute-level check (strings as found in the XML; scale converts distance to metres)."""
+        self.seen += 1
+        if self.statuses is not None and (status or "").lower() not in self.statuses:
+            return False
+        if self.tests is not None and not self._match(test, self.tests):
+            return False
+        if self.groups is not None and not self._match(group, self.groups):
+            return False
+        if self.distance:
+            try:
+                d = float(distance) * scale
+            except (TypeError, ValueError):
+                return False
+            if not all(DISTANCE_OPS[op](d, value) for op, value in self.distance):
+                return False
+        if not self.tags:
+            self.kept += 1
+        return True
+
+    def accepts_objects(self, objects):
+        """Smarttag check, after accepts(); objects as returned by clash_objects()."""
+        if not self.tags:
+            return True
+        for name, patterns in self.tags.items():
+            if not any(self._match(obj["tags"].get(name), patterns) for obj in objects if name in obj["tags"]):
+                return False
+        self.kept += 1
+        return True
+
+    def accepts_element(self, elem, test, group, units="m"):
+        """Full check on a clashresult/clashgroup element."""
+        return (self.accepts(test, group, elem.get("status"), elem.get("distance"), UNIT_SCALE.get(units, 1.0))
+                and self.accepts_objects(clash_objects(elem)))
+
+
+def as_filter(where):
+    """None, a ClashFilter or an expression string -> ClashFilter or None."""
+    if where is None or isinstance(where, ClashFilter):
+        return where
+    return ClashFilter.parse(where) if where.strip() else None
+
+
+def iter_clashes(xml_path, where=None):
+    """Yield clash records from xml_path in document order (only those accepted by where)."""
+    where = as_filter(where)
+    if where is not None:
+        where.seen = where.kept = 0
+    test_name = "Unknown Test"
+    units = "m"
+    groups = []            # stack of open clashgroup names
+    group_records = []     # only used if the report has no clashresult at all
+    seen_result = False
+    open_elems = []        # path from the root to the current element
+
+    for event, elem in ET.iterparse(str(xml_path), events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            open_elems.append(elem)
+            if tag == "clashtest":
+                test_name = elem.get("name", "Unknown Test")
+            elif tag in ("exchange", "batchtest") and elem.get("units"):
+                units = elem.get("units").strip().lower()
+            elif tag == "clashgroup":
+                groups.append(elem.get("name", ""))
+            continue
+
+        open_elems.pop()
+        if tag == "clashresult":
+            seen_result = True
+            group = groups[-1] if groups else ""
+            if where is None or where.accepts(test_name, group, elem.get("status"), elem.get("distance"),
+                                              UNIT_SCALE.get(units, 1.0)):
+                rec = clash_record(elem, "result", test_name, group, units)
+                if where is None or where.accepts_objects(rec["objects"]):
+                    yield rec
+            elem.clear()
+            # Detach it too, so even the emptied elements do not pile up in <clashresults>
+            if open_elems:
+                del open_elems[-1][:]
+        elif tag == "clashgroup":
+            name = groups.pop()
+            if not seen_result and (
+                    where is None or where.accepts(test_name, name, elem.get("status"), elem.get("distance"),
+                                                   UNIT_SCALE.get(units, 1.0))):
+                rec = clash_record(elem, "group", test_name, "", units)
+                if where is None or where.accepts_objects(rec["objects"]):
+                    group_records.append(rec)
+            elem.clear()
+        elif tag == "clashtest":
+            elem.clear()
+
+    if not seen_result:
+        yield from group_records
+
+
+def severity(record):
+    """Sort key: more negative distance = more severe; clashes without a distance come last."""
+    try:
+        return float(record["distance"])
+    except ValueError:
+        return math.inf
+
+
+def top_k_clashes(records, k, per_test=False):
+    """The k most severe records (k per test if per_test), most severe first.
+
+    A bounded heap is kept while the records stream past, so memory is O(k)
+    (per test) rather than O(report). Ties keep document order.
+    """
+    if k < 1:
+        raise ValueError(f"top-k needs a positive number of clashes, got {k}")
+    heaps = {}
+    for seq, rec in enumerate(records):
+        heap = heaps.setdefault(rec["test"] if per_test else None, [])
+        # Min-heap on (-distance, -seq): the root is the least severe record kept
+        item = (-severity(rec), -seq, rec)
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        elif item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+    kept = [item for heap in heaps.values() for item in heap]
+    kept.sort(key=lambda item: (-item[0], -item[1]))
+    return [rec for _, _, rec in kept]
+
+
+def positive_int(text):
+    """argparse type for --top-k: an integer of at least 1."""
+    try:
+        value = int(text)
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got '{text}'")
+    return value
+
+
+def quiet_broken_pipe():
+    """After BrokenPipeError on stdout (reader went away, e.g. piped into head): stop quietly.
+
+    stdout is pointed at devnull, so the interpreter's final flush does not
+    report the broken pipe again at exit.
+    """
+    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
+def object_key(obj):
+    """Identity of one clash object: its item GUID, else Item Name + Network name ("" if neither)."""
+    tags = obj["tags"]
+    guid = tags.get("Item GUID") or obj["attributes"].get("GUID")
+    if guid:
+        return guid.lower()
+    if tags.get("Item Name"):
+        return f"{tags['Item Name']}|{tags.get('Civil3D General:Network name', '')}"
+    return ""
+
+
+def pair_key(objects):
+    """Order-independent key for the two objects of a clash, or None if they cannot be identified."""
+    key = tuple(sorted(object_key(obj) for obj in objects))
+    return key if len(key) == 2 and all(key) else None
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python clash_reader.py path/to/input.xml")
+        sys.exit(1)
+    xml_file = Path(sys.argv[1])
+    if not xml_file.exists():
+        print(f"XML file not found: {xml_file}")
+        sys.exit(1)
+    for n, rec in enumerate(iter_clashes(xml_file), start=1):
+        print(f"{n}\t{rec['test']}\t{rec['name']}\t{rec['status']}\t{rec['distance']}\t{rec['guid']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+clash_spatial.py
+Uniform-grid spatial index over clash points (NumPy).
+
+GridIndex hashes every point into a cubic cell of side cell_size; points are
+sorted by cell so each cell is one contiguous slice. Neighbour searches only
+look at the 27 cells around a point, and all-pairs searches are done for all
+points at once with array operations (no Python loop per point).
+
+Queries (one point at a time, no scan of the whole report):
+    index.within(p, r)        indices and distances of points within r of p
+    index.nearest(p, k)       the k nearest points to p
+    index.nearest_to(n, k)    the k nearest points to point n (excluding n)
+A query reads one contiguous slice of the sorted points per (x, y) column of
+cells it covers, so its cost depends on the local density, not the report
+size.
+
+cluster_points() groups points that are chained together by gaps of at most
+radius (single linkage) - the connected components of the "within radius"
+graph.
+
+Usage:
+    python clash_spatial.py input.xml [--radius R]                 # print clusters
+    python clash_spatial.py input.xml --near Clash12 [--k 5]       # nearest clashes
+    python clash_spatial.py input.xml --within X Y Z R             # clashes around a point
+"""
+
+import argparse
+import time
+from itertools import product
+import numpy as np
+
+# Forward half of the 26 neighbouring cells: each cell pair is visited once
+HALF_OFFSETS = [o for o in product((-1, 0, 1), repeat=3) if o > (0, 0, 0)]
+
+
+def as_points(points):
+    """(n, 3) float array; None entries become NaN rows (ignored by the index)."""
+    if isinstance(points, np.ndarray):
+        return points.astype(float, copy=False).reshape(-1, 3)
+    return np.array([p if p is not None else (np.nan, np.nan, np.nan) for p in points],
+                    dtype=float).reshape(-1, 3)
+
+
+def _expand_ranges(owners, starts, lengths):
+    """Flatten ranges [start, start + length) -> (owner per element, element)."""
+    total = int(lengths.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    ends = np.cumsum(lengths)
+    within = np.arange(total) - np.repeat(ends - lengths, lengths)
+    return np.repeat(owners, lengths), np.repeat(starts, lengths) + within
+
+
+class GridIndex:
+    def __init__(self, points, cell_size):
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.points = as_points(points)
+        self.cell_size = float(cell_size)
+        self.ids = np.flatnonzero(~np.isnan(self.points).any(axis=1))
+        pts = self.points[self.ids]
+
+        self.origin = pts.min(axis=0) if len(pts) else np.zeros(3)
+        # +1 so the -1 neighbour of the first cell still has a valid key
+        cells = self.cell_of(pts)
+        dims = cells.max(axis=0) + 2 if len(pts) else np.ones(3, dtype=np.int64)
+        if int(dims[0]) * int(dims[1]) * int(dims[2]) >= 2 ** 62:
+            raise ValueError("cell_size is too small for the extent of the points")
+        self.dims = dims
+        self.strides = np.array([dims[1] * dims[2], dims[2], 1], dtype=np.int64)
+        keys = cells @ self.strides
+
+        order = np.argsort(keys, kind="stable")
+        self.sorted_ids = self.ids[order]           # original index of each sorted point
+        self.sorted_pts = pts[order]
+        self.sorted_keys = keys[order]
+        self.cell_keys, self.cell_start, self.cell_count = np.unique(
+            self.sorted_keys, return_index=True, return_counts=True)
+
+    def __len__(self):
+        return len(self.sorted_ids)
+
+    def cell_of(self, pts):
+        return np.floor((pts - self.origin) / self.cell_size).astype(np.int64) + 1
+
+    def _candidates(self, point, reach):
+        """Sorted positions of the points in the cube of cells within reach of point's cell."""
+        if np.isnan(point).any() or not len(self):
+            return np.empty(0, dtype=np.int64)
+        cell = self.cell_of(point)
+        lo = np.maximum(cell - reach, 0)
+        hi = np.minimum(cell + reach, self.dims - 1)
+        if (lo > hi).any():
+            return np.empty(0, dtype=np.int64)
+        # Cells of one (x, y) column are consecutive keys, i.e. one slice of the sorted points
+        xs, ys = np.meshgrid(np.arange(lo[0], hi[0] + 1), np.arange(lo[1], hi[1] + 1), indexing="ij")
+        base = xs.ravel() * self.strides[0] + ys.ravel() * self.strides[1]
+        starts = np.searchsorted(self.sorted_keys, base + lo[2], side="left")
+        ends = np.searchsorted(self.sorted_keys, base + hi[2], side="right")
+        return _expand_ranges(starts, starts, ends - starts)[1]
+
+    def _ranked(self, point, positions, exclude=None):
+        d = np.sqrt(((self.sorted_pts[positions] - point) ** 2).sum(axis=1))
+        ids = self.sorted_ids[positions]
+        if exclude is not None:
+            keep = ids != exclude
+            ids, d = ids[keep], d[keep]
+        order = np.argsort(d, kind="stable")
+        return ids[order], d[order]
+
+    def within(self, point, radius, exclude=None):
+        """(indices, distances) of the points within radius of point, nearest first."""
+        point = np.asarray(point, dtype=float)
+        reach = max(1, int(np.ceil(radius / self.cell_size)))
+        ids, d = self._ranked(point, self._candidates(point, reach), exclude)
+        keep = d <= radius
+        return ids[keep], d[keep]
+
+    def nearest(self, point, k, exclude=None):
+        """(indices, distances) of the k nearest points to point."""
+        point = np.asarray(point, dtype=float)
+        total = len(self) - (exclude is not None)
+        k = min(k, total)
+        reach = 1
+        if np.isnan(point).any():
+            k = 0
+        while True:
+            ids, d = self._ranked(point, self._candidates(point, reach), exclude)
+            # The cube is guaranteed to hold every point closer than reach cells
+            if len(ids) >= k and (k == 0 or d[k - 1] <= reach * self.cell_size):
+                return ids[:k], d[:k]
+            if len(ids) >= total:
+                return ids[:k], d[:k]
+            reach *= 2
+
+    def nearest_to(self, n, k):
+        """(indices, distances) of the k nearest points to point n, excluding n itself."""
+        return self.nearest(self.points[n], k, exclude=n)
+
+    def _cells(self, keys):
+        """Slot of each key in cell_keys and whether that cell exists."""
+        slot = np.searchsorted(self.cell_keys, keys)
+        slot = np.minimum(slot, len(self.cell_keys) - 1)
+        return slot, self.cell_keys[slot] == keys
+
+    def pairs_within(self, radius):
+        """(i, j) arrays of original indices of every point pair within radius (i != j, each pair once)."""
+        if radius > self.cell_size:
+            raise ValueError("radius must not exceed the index cell_size")
+        n = len(self)
+        if n == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        pos = np.arange(n)
+        own = np.searchsorted(self.cell_keys, self.sorted_keys)
+        cell_end = self.cell_start[own] + self.cell_count[own]
+        # Same cell: only the partners sorted after the point itself
+        chunks = [_expand_ranges(pos, pos + 1, cell_end - pos - 1)]
+        for offset in HALF_OFFSETS:
+            slot, found = self._cells(self.sorted_keys + int(np.dot(offset, self.strides)))
+            chunks.append(_expand_ranges(pos[found], self.cell_start[slot[found]], self.cell_count[slot[found]]))
+        a = np.concatenate([c[0] for c in chunks])
+        b = np.concatenate([c[1] for c in chunks])
+        d2 = ((self.sorted_pts[a] - self.sorted_pts[b]) ** 2).sum(axis=1)
+        close = d2 <= radius * radius
+        return self.sorted_ids[a[close]], self.sorted_ids[b[close]]
+
+
+def connected_components(n, i, j):
+    """Component label (smallest member index) for n nodes joined by edges (i, j)."""
+    labels = np.arange(n)
+    while True:
+        li, lj = labels[i], labels[j]
+        if np.array_equal(li, lj):
+            return labels
+        low = np.minimum(li, lj)
+        # Hook each root onto the smallest root it touches, then jump pointers to the roots
+        np.minimum.at(labels, li, low)
+        np.minimum.at(labels, lj, low)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+
+def cluster_points(points, radius):
+    """Cluster label per point (smallest member index; -1 for missing points)."""
+    index = GridIndex(points, radius)
+    i, j = index.pairs_within(radius)
+    labels = connected_components(len(index.points), i, j)
+    labels[np.isnan(index.points).any(axis=1)] = -1
+    return labels
+
+
+def main():
+    from clash_reader import iter_clashes
+    parser = argparse.ArgumentParser(description="Clusters and spatial queries over a clash report")
+    parser.add_argument("xml_file")
+    parser.add_argument("--radius", type=float, default=5.0, help="cluster radius / index cell size (m)")
+    parser.add_argument("--near", metavar="CLASH", help="list the clashes nearest to this clash name")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--within", nargs=4, type=float, metavar=("X", "Y", "Z", "R"))
+    args = parser.parse_args()
+
+    records = list(iter_clashes(args.xml_file))
+    names = [f"{rec['test']} / {rec['name']}" for rec in records]
+    t0 = time.perf_counter()
+    index = GridIndex([rec["point"] for rec in records], args.radius)
+    print(f"Indexed {len(index)} of {len(records)} clash points ({(time.perf_counter() - t0) * 1000:.1f} ms)")
+
+    if args.near or args.within:
+        t0 = time.perf_counter()
+        if args.within:
+            *point, radius = args.within
+            ids, dists = index.within(point, radius)
+        else:
+            matches = [n for n, rec in enumerate(records) if rec["name"] == args.near]
+            if not matches:
+                print(f"No clash named {args.near}")
+                return
+            ids, dists = index.nearest_to(matches[0], args.k)
+        print(f"Query: {(time.perf_counter() - t0) * 1000:.3f} ms")
+        for n, d in zip(ids.tolist(), dists.tolist()):
+            print(f"{d:10.3f}  {names[n]}")
+        return
+
+    t0 = time.perf_counter()
+    labels = cluster_points(index.points, args.radius)
+    elapsed = time.perf_counter() - t0
+    groups = {}
+    for n, label in enumerate(labels.tolist()):
+        if label >= 0:
+            groups.setdefault(label, []).append(records[n]["name"])
+    multi = [members for members in groups.values() if len(members) > 1]
+    print(f"{len(records)} clashes, {len(multi)} clusters within {args.radius} ({elapsed * 1000:.1f} ms)")
+    for members in sorted(multi, key=len, reverse=True):
+        print(f"{len(members):4d}  {', '.join(members)}")
+
+
+if __name__ == "__main__":
+    main()
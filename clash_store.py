@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+clash_store.py
+History of many clash reports in one local SQLite file.
+
+import streams each XML through clash_reader.iter_clashes into the
+reports / tests / clashes / objects / smarttags tables. All ids are
+assigned up front, so every table is filled with a single executemany, and
+each file is one transaction (importing the same file again replaces it).
+query answers history questions from the indexes instead of re-parsing
+every XML. Distances and points are stored in metres.
+
+Usage:
+    python clash_store.py import clashes.sqlite "R40 Storm.xml" "R80 Storm.xml" ...
+    python clash_store.py query clashes.sqlite --network "LV1" --status active --last 10
+    python clash_store.py query clashes.sqlite --tag "Item Type=Pipe" --test "*Storm*"
+    python clash_store.py query clashes.sqlite --sql "SELECT status, COUNT(*) FROM clashes GROUP BY status"
+"""
+
+import argparse
+import datetime
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from clash_reader import iter_clashes, object_key, quiet_broken_pipe
+from clash_coords import DECIMALS, UNIT_SCALE
+from clash_ndjson import created_iso
+from rfi_register import report_date
+
+NETWORK_TAG = "Civil3D General:Network name"
+QUERY_HEADERS = ["Report", "Report Date", "Test", "Clash", "Guid", "Status", "Distance", "X", "Y", "Z",
+                 "Item 1", "Item 2"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    report_id   INTEGER PRIMARY KEY,
+    path        TEXT NOT NULL UNIQUE,
+    name        TEXT NOT NULL,
+    report_date TEXT NOT NULL,
+    imported    TEXT NOT NULL,
+    units       TEXT,
+    clashes     INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tests (
+    test_id   INTEGER PRIMARY KEY,
+    report_id INTEGER NOT NULL REFERENCES reports,
+    name      TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS clashes (
+    clash_id   INTEGER PRIMARY KEY,
+    report_id  INTEGER NOT NULL REFERENCES reports,
+    test_id    INTEGER NOT NULL REFERENCES tests,
+    kind       TEXT NOT NULL,
+    group_name TEXT,
+    name       TEXT,
+    guid       TEXT,
+    status     TEXT,
+    distance   REAL,
+    x REAL, y REAL, z REAL,
+    created    TEXT,
+    href       TEXT
+);
+CREATE TABLE IF NOT EXISTS objects (
+    object_id INTEGER PRIMARY KEY,
+    clash_id  INTEGER NOT NULL REFERENCES clashes,
+    position  INTEGER NOT NULL,
+    key       TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS smarttags (
+    object_id INTEGER NOT NULL REFERENCES objects,
+    tag       TEXT NOT NULL,
+    value     TEXT
+);
+CREATE INDEX IF NOT EXISTS reports_date ON reports (report_date, report_id);
+CREATE INDEX IF NOT EXISTS tests_report ON tests (report_id, name);
+CREATE INDEX IF NOT EXISTS clashes_report ON clashes (report_id, status);
+CREATE INDEX IF NOT EXISTS clashes_test ON clashes (test_id);
+CREATE INDEX IF NOT EXISTS clashes_guid ON clashes (guid);
+CREATE INDEX IF NOT EXISTS objects_clash ON objects (clash_id, position);
+CREATE INDEX IF NOT EXISTS objects_key ON objects (key);
+CREATE INDEX IF NOT EXISTS smarttags_value ON smarttags (tag, value, object_id);
+CREATE INDEX IF NOT EXISTS smarttags_object ON smarttags (object_id);
+"""
+
+
+def _next_id(cur, table, column):
+    return cur.execute(f"SELECT COALESCE(MAX({column}), 0) + 1 FROM {table}").fetchone()[0]
+
+
+class ClashStore:
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.executescript(SCHEMA)
+
+    # ---------- Import ----------
+    def _delete_report(self, cur, report_id):
+        cur.execute("DELETE FROM smarttags WHERE object_id IN (SELECT o.object_id FROM objects o "
+                    "JOIN clashes c ON c.clash_id = o.clash_id WHERE c.report_id = ?)", (report_id,))
+        cur.execute("DELETE FROM objects WHERE clash_id IN (SELECT clash_id FROM clashes WHERE report_id = ?)",
+                    (report_id,))
+        for table in ("clashes", "tests", "reports"):
+            cur.execute(f"DELETE FROM {table} WHERE report_id = ?", (report_id,))
+
+    def import_report(self, xml_path):
+        """Store every clash of one XML (replacing an earlier import of the same file); returns the clash count."""
+        xml_path = Path(xml_path).resolve()
+        with self.conn:
+            cur = self.conn.cursor()
+            old = cur.execute("SELECT report_id FROM reports WHERE path = ?", (str(xml_path),)).fetchone()
+            if old:
+                self._delete_report(cur, old[0])
+            report_id = _next_id(cur, "reports", "report_id")
+            test_id = _next_id(cur, "tests", "test_id")
+            clash_id = _next_id(cur, "clashes", "clash_id")
+            object_id = _next_id(cur, "objects", "object_id")
+
+            tests, clashes, objects, tags = {}, [], [], []
+            units = None
+            for rec in iter_clashes(xml_path):
+                units = units or rec["units"]
+                scale = UNIT_SCALE.get(rec["units"], 1.0)
+                if rec["test"] not in tests:
+                    tests[rec["test"]] = test_id + len(tests)
+                try:
+                    distance = float(rec["distance"]) * scale
+                except (TypeError, ValueError):
+                    distance = None
+                x = y = z = None
+                if rec["point"]:
+                    x, y, z = (round(v * scale, DECIMALS) for v in rec["point"])
+                clashes.append((clash_id, report_id, tests[rec["test"]], rec["kind"], rec["group"], rec["name"],
+                                rec["guid"], rec["status"], distance, x, y, z, created_iso(rec["created"]),
+                                rec["href"]))
+                for position, obj in enumerate(rec["objects"], start=1):
+                    objects.append((object_id, clash_id, position, object_key(obj)))
+                    tags += [(object_id, tag, value) for tag, value in obj["tags"].items()]
+                    object_id += 1
+                clash_id += 1
+
+            cur.execute("INSERT INTO reports VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (report_id, str(xml_path), xml_path.stem, report_date(xml_path),
+                         datetime.datetime.now().isoformat(timespec="seconds"), units, len(clashes)))
+            cur.executemany("INSERT INTO tests VALUES (?, ?, ?)",
+                            ((tid, report_id, name) for name, tid in tests.items()))
+            cur.executemany("INSERT INTO clashes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", clashes)
+            cur.executemany("INSERT INTO objects VALUES (?, ?, ?, ?)", objects)
+            cur.executemany("INSERT INTO smarttags VALUES (?, ?, ?)", tags)
+        return len(clashes)
+
+    # ---------- Query ----------
+    def query(self, network=None, status=None, test=None, tag=None, last=None, guid=None):
+        """QUERY_HEADERS rows of the matching clashes, newest report first.
+
+        status is a list of statuses, test a GLOB pattern, tag a (name, value)
+        pair and last the number of most recent reports to search.
+        """
+        where, params = [], []
+        if last:
+            where.append("c.report_id IN (SELECT report_id FROM reports "
+                         "ORDER BY report_date DESC, report_id DESC LIMIT ?)")
+            params.append(last)
+        if status:
+            where.append(f"c.status IN ({', '.join('?' * len(status))})")
+            params += status
+        if test:
+            where.append("t.name GLOB ?")
+            params.append(test)
+        if guid:
+            where.append("c.guid = ?")
+            params.append(guid)
+        for name, value in ([(NETWORK_TAG, network)] if network else []) + ([tag] if tag else []):
+            where.append("c.clash_id IN (SELECT o.clash_id FROM smarttags s JOIN objects o "
+                         "ON o.object_id = s.object_id WHERE s.tag = ? AND s.value = ?)")
+            params += [name, value]
+        sql = ("SELECT r.name, r.report_date, t.name, c.name, c.guid, c.status, c.distance, c.x, c.y, c.z, "
+               "o1.key, o2.key FROM clashes c "
+               "JOIN reports r ON r.report_id = c.report_id "
+               "JOIN tests t ON t.test_id = c.test_id "
+               "LEFT JOIN objects o1 ON o1.clash_id = c.clash_id AND o1.position = 1 "
+               "LEFT JOIN objects o2 ON o2.clash_id = c.clash_id AND o2.position = 2")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY r.report_date DESC, r.report_id DESC, c.clash_id"
+        return self.conn.execute(sql, params).fetchall()
+
+    def reports(self):
+        return self.conn.execute("SELECT name, report_date, clashes FROM reports "
+                                 "ORDER BY report_date, report_id").fetchall()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _print_rows(headers, rows):
+    try:
+        print("\t".join(headers))
+        for row in rows:
+            print("\t".join("" if v is None else str(v) for v in row))
+        sys.stdout.flush()
+    except BrokenPipeError:
+        quiet_broken_pipe()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite history of Navisworks clash reports")
+    commands = parser.add_subparsers(dest="command", required=True)
+    imp = commands.add_parser("import", help="add (or re-import) clash XMLs")
+    imp.add_argument("db")
+    imp.add_argument("xml_files", nargs="+")
+    qry = commands.add_parser("query", help="clashes matching all the given filters")
+    qry.add_argument("db")
+    qry.add_argument("--network", help="an object's Civil3D network name")
+    qry.add_argument("--status", help="comma-separated statuses, e.g. new,active")
+    qry.add_argument("--test", help="clash test name (GLOB pattern, e.g. *Storm*)")
+    qry.add_argument("--tag", help='an object smarttag, e.g. "Item Type=Pipe"')
+    qry.add_argument("--guid", help="one clash guid across reports")
+    qry.add_argument("--last", type=int, help="only the N most recent reports")
+    qry.add_argument("--sql", help="run this SQL instead and print its rows")
+    qry.add_argument("--reports", action="store_true", help="list the imported reports")
+    args = parser.parse_args()
+
+    with ClashStore(args.db) as store:
+        if args.command == "import":
+            for xml_file in args.xml_files:
+                if not Path(xml_file).exists():
+                    print(f"XML file not found: {xml_file}")
+                    continue
+                start = time.perf_counter()
+                count = store.import_report(xml_file)
+                print(f"Imported {xml_file}: {count} clashes ({time.perf_counter() - start:.2f}s)")
+            return
+
+        if args.reports:
+            _print_rows(["Report", "Report Date", "Clashes"], store.reports())
+            return
+        if args.sql:
+            cur = store.conn.execute(args.sql)
+            _print_rows([d[0] for d in cur.description or []], cur.fetchall())
+            return
+        tag = None
+        if args.tag:
+            if "=" not in args.tag:
+                print(f"--tag needs NAME=VALUE, got '{args.tag}'")
+                sys.exit(1)
+            name, value = args.tag.split("=", 1)
+            tag = (name.strip(), value.strip())
+        status = [s.strip() for s in args.status.split(",")] if args.status else None
+        start = time.perf_counter()
+        rows = store.query(args.network, status, args.test, tag, args.last, args.guid)
+        _print_rows(QUERY_HEADERS, rows)
+        print(f"{len(rows)} clashes ({(time.perf_counter() - start) * 1000:.1f} ms)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+clash_summary.py
+Report statistics accumulated while the exporters emit their rows.
+
+ClashSummary.add() is called once per clash from the exporters' own row
+loop (counters only, no extra walk over the XML); the distance histogram is
+one vectorized pass over the coordinate block's distances. rows() gives the
+table written to the Excel "Summary" sheet and the Word summary table;
+summary.objects is the report's hot_objects.ObjectIndex.
+"""
+
+from collections import Counter
+import numpy as np
+from hot_objects import ObjectIndex
+
+SUMMARY_HEADERS = ["Breakdown", "Value", "Clashes", "Share"]
+SUMMARY_COL_WIDTHS = {1: 14, 2: 40, 3: 10, 4: 10}
+# Histogram edges in metres (clash distances are negative penetrations)
+DISTANCE_BINS = [-0.5, -0.2, -0.1, -0.05, -0.02, -0.01, 0.0]
+
+
+def distance_histogram(distances, bins=DISTANCE_BINS):
+    """[(label, count)] for the open-ended bins around the given edges (NaN skipped)."""
+    d = np.asarray(distances, dtype=float)
+    d = d[~np.isnan(d)]
+    counts = np.bincount(np.searchsorted(bins, d, side="right"), minlength=len(bins) + 1)
+    labels = [f"< {bins[0]:.3f} m"]
+    labels += [f"{lo:.3f} to {hi:.3f} m" for lo, hi in zip(bins, bins[1:])]
+    labels += [f">= {bins[-1]:.3f} m"]
+    return list(zip(labels, counts.tolist()))
+
+
+class ClashSummary:
+    def __init__(self, report=""):
+        self.report = report
+        self.total = 0
+        self.by = {"Test": Counter(), "Group": Counter(), "Status": Counter(), "Item Type": Counter()}
+        self.objects = ObjectIndex()
+
+    def add(self, test, group, status, objects, distance=None):
+        """Count one clash; objects are clash_reader.clash_objects() dicts."""
+        self.total += 1
+        self.objects.add(objects, test, self.report, distance)
+        self.by["Test"][test] += 1
+        self.by["Group"][group or "(none)"] += 1
+        self.by["Status"][status or "(none)"] += 1
+        for item_type in {obj["tags"].get("Item Type") or "(unknown)" for obj in objects}:
+            self.by["Item Type"][item_type] += 1
+
+    def rows(self, distances=None):
+        """SUMMARY_HEADERS rows: total, then each breakdown (largest first) and the distance histogram."""
+        rows = [["Total", "All clashes", self.total, 1.0 if self.total else None]]
+        sections = [(name, counts.most_common()) for name, counts in self.by.items()]
+        if distances is not None:
+            sections.append(("Distance", distance_histogram(distances)))
+        for name, counts in sections:
+            for value, count in counts:
+                rows.append([name, value, count, round(count / self.total, 3) if self.total else None])
+        return rows
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+clash_timeline.py
+Clash creation dates (createddate/date) as one datetime64 array per report.
+
+The date attributes of every clash are converted to integers in one array
+conversion and combined into datetime64[s] with array arithmetic; no date
+is parsed row by row. From that array come each clash's age and the weekly
+Timeline (clashes created per week, by status).
+
+Usage:
+    python clash_timeline.py path/to/input.xml      # print the timeline
+"""
+
+import sys
+import datetime
+import numpy as np
+
+TIMELINE_SHEET = "Timeline"
+WEEK_COL_WIDTH = 14
+STATUS_COL_WIDTH = 11
+NAT = np.datetime64("NaT", "s")
+
+
+def _int_fields(date):
+    try:
+        return [int(float(v)) for v in date]
+    except ValueError:
+        return [0] * 6
+
+
+def created_array(records):
+    """datetime64[s] creation time per clash_reader record (NaT where missing or invalid)."""
+    n = len(records)
+    if n == 0:
+        return np.empty(0, dtype="datetime64[s]")
+    present = np.array([rec["created"] is not None for rec in records])
+    fields = np.zeros((n, 6), dtype=np.int64)
+    if present.any():
+        raw = [rec["created"] for rec in records if rec["created"] is not None]
+        try:
+            fields[present] = np.array(raw, dtype=float).astype(np.int64)
+        except ValueError:
+            fields[present] = [_int_fields(date) for date in raw]     # malformed report: slow path
+    year, month, day, hour, minute, second = fields.T
+    valid = present & (year > 0) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31)
+
+    months = (year - 1970) * 12 + (month - 1)
+    out = (months.astype("datetime64[M]").astype("datetime64[D]") + (day - 1).astype("timedelta64[D]")
+           ).astype("datetime64[s]")
+    out = out + (hour * 3600 + minute * 60 + second).astype("timedelta64[s]")
+    out[~valid] = NAT
+    return out
+
+
+def ages_days(created, as_of):
+    """Whole days from each creation time to as_of (a date/datetime); None where unknown."""
+    as_of = np.datetime64(as_of, "s")
+    unknown = np.isnat(created)
+    delta = np.where(unknown, np.timedelta64(0, "s"), as_of - created)
+    days = (delta // np.timedelta64(1, "D")).astype(float)
+    days[unknown] = np.nan
+    return [None if d != d else int(d) for d in days.tolist()]
+
+
+def week_start(created):
+    """Monday of each creation date (datetime64[D])."""
+    days = created.astype("datetime64[D]")
+    # 1970-01-01 was a Thursday: day 0 is weekday 3 counting from Monday
+    return days - ((days.astype(np.int64) + 3) % 7).astype("timedelta64[D]")
+
+
+def timeline(created, statuses):
+    """(headers, rows): clashes created per week (Monday) and status, plus a total column."""
+    statuses = np.asarray([s or "(none)" for s in statuses], dtype=object)
+    known = ~np.isnat(created)
+    if not known.any():
+        return ["Week Starting", "Total"], []
+    weeks, week_idx = np.unique(week_start(created[known]), return_inverse=True)
+    names, status_idx = np.unique(statuses[known].astype(str), return_inverse=True)
+    counts = np.bincount(week_idx * len(names) + status_idx,
+                         minlength=len(weeks) * len(names)).reshape(len(weeks), len(names))
+    headers = ["Week Starting", *names.tolist(), "Total"]
+    rows = [[week.astype(datetime.date), *row, sum(row)]
+            for week, row in zip(weeks, counts.tolist())]
+    return headers, rows
+
+
+def timeline_col_widths(headers):
+    return {c: (WEEK_COL_WIDTH if c == 1 else STATUS_COL_WIDTH) for c in range(1, len(headers) + 1)}
+
+
+def main():
+    from clash_reader import iter_clashes
+    if len(sys.argv) < 2:
+        print("Usage: python clash_timeline.py path/to/input.xml")
+        sys.exit(1)
+    records = list(iter_clashes(sys.argv[1]))
+    headers, rows = timeline(created_array(records), [rec["status"] for rec in records])
+    print("\t".join(headers))
+    for row in rows:
+        print("\t".join(str(v) for v in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,32 @@ XML_FILE = "GBL7A-40R-CLASH DETECTION.xml"
 OUTPUT_FILE = r"C:\ClashReport\Clash_Report.xlsx"
 
 #----OUTPUT_FILE = r"C:\ClashReport\Clash_Report.docx"
+
+#-----Excel writer: "openpyxl" (in memory) or "xlsxwriter" (streams rows, for very large reports)
+EXCEL_BACKEND = "openpyxl"
+
+#-----Optional branded .xlsx template for the openpyxl backend; None uses the built-in layout
+EXCEL_TEMPLATE = None
+
+#-----Project RFI register (SQLite); None numbers clashes 1..N per report
+RFI_REGISTER = None
+#----RFI_REGISTER = r"C:\ClashReport\rfi_register.sqlite"
+
+#-----Collapse clashes between the same two objects found by several tests into one row
+DEDUPE_ACROSS_TESTS = False
+
+#-----Group clashes within this distance (m) into suggested RFI clusters; None turns it off
+CLUSTER_RADIUS = 5.0
+
+#-----List other clashes within this distance (m) in the Clash_Points "Nearby Clashes" column; None turns it off
+NEARBY_RADIUS = None
+
+#-----Only export matching clashes, e.g. "status=new,active; test=Storm*; distance<=-0.02"; None exports all
+CLASH_FILTER = None
+
+#-----Word report volumes: "test" writes one .docx per clash test; WORD_MAX_ROWS caps clashes per volume (None = one document)
+WORD_SPLIT_BY = None
+WORD_MAX_ROWS = None
 print("Finished running export_xml_to_word_v1.py")
 
  
\ No newline at end of file
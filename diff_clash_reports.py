@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+python diff_clash_reports.py old.xml new.xml [output.xlsx]
+Compares two clash reports and writes a "Clash Diff" sheet listing the
+clashes that are new, resolved, moved or changed status.
+
+Both reports are read with clash_reader.iter_clashes (streaming). The old
+report is loaded into a hash table keyed by clash guid (clashes without a
+guid are kept in a list beside it), with further indexes on the pair of
+object GUIDs and on test + clash name; the new report is then streamed
+against it, so the diff runs in linear time and only the old report (plus
+the new clashes without a guid match) is held in memory, as one small tuple
+per clash. Diff rows go out through a write-only workbook as they are found.
+
+Matching: same clash guid, else the same (unordered) pair of objects - so a
+clash that Navisworks re-created after a model update still pairs up - and,
+for old clashes without a guid, the same test + clash name. Pairs are only
+matched once the whole new report has been read, so an old clash whose guid
+turns up later in the file is never taken by another clash; among several
+old clashes of one pair, the one in the same test wins.
+
+Distances, dX/dY/dZ and Moved By are in metres (clash_reader.UNIT_SCALE).
+"""
+
+import sys
+from pathlib import Path
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill, Font, Alignment
+from openpyxl.utils import get_column_letter
+from clash_reader import UNIT_SCALE, iter_clashes, pair_key
+from export_xml_to_excel_v8 import HEADER_HEIGHT, HEADER_FILL, HEADER_FONT_COLOR
+from package_writer import save_workbook
+
+# ---------- Layout constants ----------
+DIFF_SHEET = "Clash Diff"
+DIFF_HEADERS = ["Change", "Test Name", "Clash Name", "Guid", "Matched By",
+                "Old Status", "New Status", "Old Distance", "New Distance",
+                "dX", "dY", "dZ", "Moved By", "Item 1", "Item 2"]
+DIFF_COL_WIDTHS = {1: 22, 2: 22, 3: 14, 4: 38, 5: 12, 6: 11, 7: 11, 8: 12,
+                   9: 12, 10: 10, 11: 10, 12: 10, 13: 10, 14: 30, 15: 30}
+MOVE_TOLERANCE = 0.001     # metres; clash points are reported to 3 dp
+
+# ---------- Helpers ----------
+def item_names(rec):
+    names = [obj["tags"].get("Item Name", "") for obj in rec["objects"]]
+    return (names + ["", ""])[:2]
+
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def compact(rec):
+    """Record kept for the diff rows: only what they need, distance and point in metres."""
+    scale = UNIT_SCALE.get(rec["units"], 1.0)
+    distance = to_float(rec["distance"])
+    point = tuple(v * scale for v in rec["point"]) if rec["point"] else None
+    return (rec["test"], rec["name"], rec["status"], distance * scale if distance is not None else None, point,
+            *item_names(rec))
+
+
+class OldReport:
+    """The old report's clashes, each taken at most once.
+
+    by_guid holds the clashes with a guid; those without one sit in a list
+    (no_guid, None once taken) reachable only by object pair or by test +
+    clash name. A reference is a guid (str) or a no_guid index (int).
+    """
+
+    def __init__(self, xml_path):
+        self.by_guid = {}
+        self.no_guid = []
+        self.by_pair = {}
+        self.by_name = {}
+        for rec in iter_clashes(xml_path):
+            old = compact(rec)
+            if rec["guid"]:
+                ref = rec["guid"]
+                self.by_guid[ref] = old
+            else:
+                ref = len(self.no_guid)
+                self.no_guid.append(old)
+                self.by_name.setdefault((rec["test"], rec["name"]), []).append(ref)
+            key = pair_key(rec["objects"])
+            if key:
+                self.by_pair.setdefault(key, []).append(ref)
+
+    def get(self, ref):
+        return self.by_guid.get(ref) if isinstance(ref, str) else self.no_guid[ref]
+
+    def take(self, ref):
+        if isinstance(ref, str):
+            return self.by_guid.pop(ref)
+        old, self.no_guid[ref] = self.no_guid[ref], None
+        return old
+
+    def take_guid(self, guid):
+        return self.by_guid.pop(guid, None) if guid else None
+
+    def take_match(self, new, key):
+        """-> (matched by, compact record) of an untaken old clash, or None.
+
+        The same object pair (same test first), else - among the old clashes
+        without a guid - the same test + clash name.
+        """
+        candidates = [ref for ref in self.by_pair.get(key, ()) if self.get(ref)] if key else []
+        if candidates:
+            ref = next((ref for ref in candidates if self.get(ref)[0] == new[0]), candidates[0])
+            return "object pair", self.take(ref)
+        ref = next((ref for ref in self.by_name.get((new[0], new[1]), ()) if self.get(ref)), None)
+        if ref is not None:
+            return "test + name", self.take(ref)
+        return None
+
+    def remaining(self):
+        """(guid, compact record) of every old clash not taken."""
+        yield from self.by_guid.items()
+        yield from (("", old) for old in self.no_guid if old)
+
+
+def compare(guid, new, old, matched_by, counts):
+    """Diff row of a matched clash, or None if it is unchanged."""
+    test, name, status, new_dist, point, item1, item2 = new
+    _, _, old_status, old_dist, old_point, _, _ = old
+    changes = []
+    delta = [None, None, None]
+    moved_by = None
+    if old_point and point:
+        delta = [round(n - o, 3) for n, o in zip(point, old_point)]
+        moved_by = round(sum(d * d for d in delta) ** 0.5, 3)
+        if moved_by > MOVE_TOLERANCE:
+            changes.append("Moved")
+            counts["Moved"] += 1
+    if old_status != status:
+        changes.append("Status changed")
+        counts["Status changed"] += 1
+    if not changes:
+        counts["Unchanged"] += 1
+        return None
+    return [", ".join(changes), test, name, guid, matched_by, old_status, status,
+            old_dist, new_dist, *delta, moved_by, item1, item2]
+
+
+def diff_reports(old_xml, new_xml):
+    """Yield one diff row (list of DIFF_HEADERS values) per new/resolved/moved/changed clash."""
+    old_report = OldReport(old_xml)
+    counts = {"New": 0, "Resolved": 0, "Moved": 0, "Status changed": 0, "Unchanged": 0}
+
+    # Guid matches while streaming; the rest wait until every guid has had its chance
+    unmatched = []
+    for rec in iter_clashes(new_xml):
+        new = compact(rec)
+        old = old_report.take_guid(rec["guid"])
+        if old is None:
+            unmatched.append((rec["guid"], pair_key(rec["objects"]), new))
+            continue
+        row = compare(rec["guid"], new, old, "guid", counts)
+        if row:
+            yield row
+
+    for guid, key, new in unmatched:
+        found = old_report.take_match(new, key)
+        if found is None:
+            test, name, status, dist, _, item1, item2 = new
+            counts["New"] += 1
+            yield ["New", test, name, guid, "", "", status, None, dist, None, None, None, None, item1, item2]
+            continue
+        row = compare(guid, new, found[1], found[0], counts)
+        if row:
+            yield row
+
+    # Whatever is left of the old report did not appear in the new one
+    for guid, (test, name, status, dist, _, item1, item2) in old_report.remaining():
+        counts["Resolved"] += 1
+        yield ["Resolved", test, name, guid, "", status, "", dist, None, None, None, None, None, item1, item2]
+
+    print("Diff: {New} new, {Resolved} resolved, {Moved} moved, {Status changed} status changed, "
+          "{Unchanged} unchanged".format(**counts))
+
+# ---------- Workbook ----------
+def write_diff_workbook(rows, output_file):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=DIFF_SHEET)
+    for col, width in DIFF_COL_WIDTHS.items():
+        ws.column_dimensions[get_column_letter(col)].width = width
+    ws.freeze_panes = "A2"
+    ws.row_dimensions[1].height = HEADER_HEIGHT
+
+    header_fill = PatternFill(start_color=HEADER_FILL, end_color=HEADER_FILL, fill_type="solid")
+    header_font = Font(bold=True, color=HEADER_FONT_COLOR)
+    header_align = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    header = []
+    for text in DIFF_HEADERS:
+        cell = WriteOnlyCell(ws, value=text)
+        cell.fill, cell.font, cell.alignment = header_fill, header_font, header_align
+        header.append(cell)
+    ws.append(header)
+
+    last_row = 1
+    for row in rows:
+        ws.append(row)
+        last_row += 1
+    ws.auto_filter.ref = f"A1:{get_column_letter(len(DIFF_HEADERS))}{last_row}"
+
+    save_workbook(wb, output_file)
+
+
+def export_diff(old_xml, new_xml, output_file):
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    write_diff_workbook(diff_reports(old_xml, new_xml), output_file)
+    print(f"Saved: {output_file}")
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python diff_clash_reports.py old.xml new.xml [output.xlsx]")
+        sys.exit(1)
+    old_xml, new_xml = Path(sys.argv[1]), Path(sys.argv[2])
+    for xml_file in (old_xml, new_xml):
+        if not xml_file.exists():
+            print(f"XML file not found: {xml_file}")
+            sys.exit(1)
+    output = Path(sys.argv[3]) if len(sys.argv) > 3 else new_xml.with_name(f"{new_xml.stem} - diff.xlsx")
+    export_diff(old_xml, new_xml, output)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,21 +3,52 @@
 python export_xml_to_excel_v8.py
 Parses clash XML and writes a styled Excel workbook:
 - Main sheet: table named "Clash_1" with 10 columns, styles, borders, images fit to cell.
-- Second sheet: "Clash_Points" with numeric X/Y/Z (3 decimal places).
-Config: config.XML_FILE and config.OUTPUT_FILE
+- Second sheet: "Clash_Points" with numeric X/Y/Z (metres, 3 decimal places),
+  proximity cluster and nearby clashes.
+- "Clusters", "Summary", "Test Extents" and "Hot Objects" sheets: cluster
+  summary, counts by test/group/status/item type with a distance histogram,
+  per-test bounding boxes and distance statistics from the report's
+  coordinate block, and the objects taking part in the most clashes.
+- "Timeline" sheet: clashes created per week by status (createddate), and
+  each clash's age on Clash_Points.
+- Hidden sheet: "Export_State" (clash key, status, distance, image hash
+  and stamp per row),
+  used by incremental=True to reuse thumbnails from the previous export and
+  by merge=True to keep the engineers' User Images / Comments columns.
+Config: config.XML_FILE and config.OUTPUT_FILE (or the command line, see --help),
+e.g. python export_xml_to_excel_v8.py report.xml out.xlsx --top-k 50 --per-test
+
+Two writer backends produce the same workbook (config.EXCEL_BACKEND or --backend):
+- "openpyxl"   (default) builds the workbook in memory.
+- "xlsxwriter" streams rows with constant_memory, for very large reports.
 """
 
+import argparse
+import datetime
 import xml.etree.ElementTree as ET
 from pathlib import Path
+from io import BytesIO
+import copyreg
+import hashlib
 import os
-import tempfile
-from openpyxl import Workbook
+import pickle
+import posixpath
+import zipfile
+from openpyxl import Workbook, load_workbook
 from openpyxl.drawing.image import Image as XLImage
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+from openpyxl.formatting.rule import FormulaRule
 from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.table import Table, TableStyleInfo
-from PIL import Image as PILImage
+from openpyxl.worksheet.dimensions import DimensionHolder
+from openpyxl.worksheet.table import Table, TableList, TableStyleInfo
 import config
+from clash_core import (add_nearby_clashes, add_report_arguments, assign_clusters, image_stamp, load_report,
+                        prepare_thumbnails, register_key, run_jobs)
+from package_writer import save_workbook
+from clash_coords import EXTENT_HEADERS
+from clash_summary import SUMMARY_HEADERS, SUMMARY_COL_WIDTHS
+from clash_timeline import TIMELINE_SHEET, ages_days, created_array, timeline, timeline_col_widths
+from hot_objects import HOT_SHEET, HOT_HEADERS, HOT_COL_WIDTHS
 
 # ---------- Layout constants ----------
 HEADER_HEIGHT = 35
@@ -26,8 +57,55 @@ HEADER_FILL = "2C7676"
 HEADER_FONT_COLOR = "FFFFFF"
 ALT_ROW_FILL = "DCE6F1"
 TABLE_NAME = "Clash_1"
+TABLE_STYLE = "TableStyleMedium9"
 IMAGE_PADDING_PX = 8
 
+COL_WIDTHS = {
+    1: 5,    # A RFI No
+    2: 25,   # B Test Name
+    3: 35,   # C Group Name
+    4: 30,   # D Clash Details
+    5: 30,   # E Item 1
+    6: 30,   # F Item 2
+    7: 25,   # G Item 2 Name
+    8: 45,   # H Clash Image
+    9: 45,   # I User Images
+    10: 30   # J Comments
+}
+HEADERS = ["RFI No", "Test Name", "Group Name", "Clash Details",
+           "Item 1", "Item 2", "Item 2 Name", "Clash Image", "User Images", "Comments"]
+IMAGE_COL = 8
+USER_IMAGES_COL = 9
+COMMENTS_COL = 10
+
+CP_HEADERS = ["ID", "Group", "Clash Name", "X", "Y", "Z", "Cluster", "Nearby Clashes", "Age (days)"]
+CP_COL_WIDTHS = {1: 6, 2: 18, 3: 25, 4: 12, 5: 12, 6: 12, 7: 9, 8: 40, 9: 10}
+CP_CLUSTER_COL = 7
+CP_NEARBY_COL = 8
+CP_AGE_COL = 9
+
+# Proximity clusters: suggested RFI groups of clashes close to each other
+CLUSTER_SHEET = "Clusters"
+CLUSTER_HEADERS = ["Cluster", "Clashes", "Tests", "RFI Nos", "Centre X", "Centre Y", "Centre Z", "Extent (m)"]
+CLUSTER_COL_WIDTHS = {1: 9, 2: 9, 3: 30, 4: 30, 5: 12, 6: 12, 7: 12, 8: 11}
+
+# Counts by test / group / status / item type and a distance histogram
+SUMMARY_SHEET = "Summary"
+
+# Per-test bounding boxes and distance statistics (from the coordinate block)
+EXTENT_SHEET = "Test Extents"
+EXTENT_COL_WIDTHS = {1: 22, **{c: 12 for c in range(2, len(EXTENT_HEADERS) + 1)}}
+
+# Hidden sheet that lets the next export find unchanged clashes
+STATE_SHEET = "Export_State"
+STATE_HEADERS = ["Clash Key", "RFI No", "Status", "Distance", "Image Hash", "Image Stamp"]
+
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+NS_XDR = "http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing"
+NS_A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+
 # ---------- Helper functions ----------
 def col_width_to_pixels(col_width):
     return int(col_width * 7 + 5)
@@ -35,304 +113,714 @@ def col_width_to_pixels(col_width):
 def row_height_to_pixels(row_height_pts):
     return int(row_height_pts * 96 / 72)
 
-def find_image_file(href_raw: str, xml_path: Path):
-    if not href_raw:
-        return None
-    href = href_raw.replace("\\", "/").strip()
-    candidates = []
-    p = Path(href)
-    if p.is_absolute():
-        candidates.append(p)
-    xml_dir = xml_path.parent
-    candidates.append(xml_dir / href)
-    fname = Path(href).name
-    candidates.append(xml_dir / fname)
-    candidates.append(xml_dir / "ELV_files" / fname)
-    for cand in candidates:
-        try:
-            cand_resolved = cand.resolve()
-        except Exception:
-            cand_resolved = cand
-        if cand_resolved.exists():
-            return Path(cand_resolved)
-    return None
-
-def resize_image_for_cell(orig_path: Path, target_width_px: int, target_height_px: int, padding_px=8):
-    try:
-        img = PILImage.open(orig_path)
-    except Exception as e:
-        print(f"Could not open image {orig_path}: {e}")
-        return None
-    max_w = max(1, target_width_px - padding_px)
-    max_h = max(1, target_height_px - padding_px)
-    w, h = img.size
-    ratio = min(max_w / w, max_h / h, 1.0)
-    new_w = int(w * ratio)
-    new_h = int(h * ratio)
-    img = img.resize((new_w, new_h), PILImage.LANCZOS)
-    suffix = orig_path.suffix or ".png"
-    tf = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    tmp_path = Path(tf.name)
-    tf.close()
-    img.save(tmp_path)
-    return tmp_path
-
-def get_item_name_short(item_details_text):
-    for line in item_details_text.splitlines():
-        if line.startswith("Item Name:"):
-            return line.replace("Item Name:", "").strip()
-    first = item_details_text.splitlines()[0] if item_details_text else ""
-    return first or "Unknown"
-
-def get_item_details(clash_object):
-    if clash_object is None:
-        return ""
-    tags = {}
-    for st in clash_object.findall(".//smarttag"):
-        name = st.findtext("name", "").strip()
-        val = st.findtext("value", "").strip()
-        if name:
-            tags[name] = val
-    lines = []
-    if tags.get("Item Name"):
-        lines.append(f"Item Name: {tags.get('Item Name')}")
-    if tags.get("Civil3D General:Network name"):
-        lines.append(f"Network: {tags.get('Civil3D General:Network name')}")
-    part = tags.get("Civil3D General:Part Size Name", "")
-    itype = tags.get("Item Type", "")
-    type_line = " ".join(filter(None, [part, itype])).strip()
-    if type_line:
-        lines.append(f"Item Type: {type_line}")
-    inner = tags.get("Civil3D General:Inner Diameter or Width", "")
-    outer = tags.get("Civil3D General:Outer Diameter or Width", "")
-    if inner or outer:
-        lines.append(f"Pipe {inner} x {outer}".strip())
-    return "\n".join(lines)
-
-# ---------- Main export function ----------
-def export_to_excel(xml_file, output_file):
-    xml_path = Path(xml_file)
-    if not xml_path.exists():
-        print(f"XML file not found: {xml_file}")
-        return
-
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-
+def build_row_borders(is_first, is_last, n_cols=10):
+    """Borders for one row: thick around the table edge, double inside."""
+    thick = Side(style="thick", color="000000")
+    double = Side(style="double", color="000000")
+    top = thick if is_first else double
+    bottom = thick if is_last else double
+    return [Border(left=thick if c == 1 else double,
+                   right=thick if c == n_cols else double,
+                   top=top, bottom=bottom)
+            for c in range(1, n_cols + 1)]
+
+# ---------- Workbook template ----------
+def table_style_info():
+    return TableStyleInfo(name=TABLE_STYLE, showFirstColumn=False,
+                          showLastColumn=False, showRowStripes=False, showColumnStripes=False)
+
+def build_template_workbook():
+    """Empty, fully styled workbook built from the layout constants (header rows only)."""
     wb = Workbook()
     ws = wb.active
     ws.title = "Clash Report"
 
-    # ---------- Column widths ----------
-    COL_WIDTHS = {
-        1: 5,    # A RFI No
-        2: 25,   # B Test Name
-        3: 35,   # C Group Name
-        4: 30,   # D Clash Details
-        5: 30,   # E Item 1
-        6: 30,   # F Item 2
-        7: 25,   # G Item 2 Name
-        8: 45,   # H Clash Image
-        9: 45,   # I User Images
-        10: 30   # J Comments
-    }
+    header_fill = PatternFill(start_color=HEADER_FILL, end_color=HEADER_FILL, fill_type="solid")
+    header_font = Font(color=HEADER_FONT_COLOR, bold=True)
+    header_align = Alignment(horizontal="center", vertical="center", wrap_text=True)
 
     for col_idx, w in COL_WIDTHS.items():
         ws.column_dimensions[get_column_letter(col_idx)].width = w
+    ws.append(HEADERS)
+    ws.row_dimensions[1].height = HEADER_HEIGHT
+    for c_idx, border in enumerate(build_row_borders(True, False), start=1):
+        cell = ws.cell(row=1, column=c_idx)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = header_align
+        cell.border = border
+    # Placeholder range; the exporter resizes it to the written rows
+    table = Table(displayName=TABLE_NAME, ref=f"A1:{get_column_letter(len(HEADERS))}2")
+    table.tableStyleInfo = table_style_info()
+    ws.add_table(table)
 
-    # ---------- Headers ----------
-    headers = ["RFI No", "Test Name", "Group Name", "Clash Details",
-               "Item 1", "Item 2", "Item 2 Name", "Clash Image", "User Images", "Comments"]
+    cp = wb.create_sheet(title="Clash_Points")
+    cp.append(CP_HEADERS)
+    cp.row_dimensions[1].height = HEADER_HEIGHT
+    for ci in range(1, len(CP_HEADERS) + 1):
+        cell = cp.cell(row=1, column=ci)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = header_align
+    for col_idx, w in CP_COL_WIDTHS.items():
+        cp.column_dimensions[get_column_letter(col_idx)].width = w
+    return wb
+
+def save_template(path):
+    """Write the built-in template as .xlsx, e.g. as a starting point for a branded one."""
+    build_template_workbook().save(path)
+
+def template_signature(template=None):
+    """Cache key: the layout constants, or the template file's identity."""
+    if template:
+        st = Path(template).stat()
+        return (str(Path(template).resolve()), st.st_size, st.st_mtime_ns)
+    return (HEADER_HEIGHT, HEADER_FILL, HEADER_FONT_COLOR, TABLE_NAME, TABLE_STYLE,
+            tuple(sorted(COL_WIDTHS.items())), tuple(HEADERS), tuple(CP_HEADERS), tuple(sorted(CP_COL_WIDTHS.items())))
+
+def _reduce_dimension_holder(holder):
+    return (DimensionHolder, (holder.worksheet, holder.reference, holder.default_factory),
+            None, None, iter(dict.items(holder)))
+
+def _reduce_table_list(tables):
+    return (TableList, (), None, None, iter(dict.items(tables)))
+
+class TemplatePickler(pickle.Pickler):
+    """Pickler for openpyxl workbooks.
+
+    DimensionHolder (a defaultdict bound to its worksheet) and TableList
+    (whose items() returns table refs) do not round-trip with the default
+    dict reduction, so both are reduced from their raw dict items.
+    """
+    dispatch_table = {**copyreg.dispatch_table,
+                      DimensionHolder: _reduce_dimension_holder,
+                      TableList: _reduce_table_list}
+
+def pickle_workbook(wb):
+    buf = BytesIO()
+    TemplatePickler(buf, protocol=pickle.HIGHEST_PROTOCOL).dump(wb)
+    return buf.getvalue()
+
+# signature -> pickled template, for this process only (never written to disk,
+# so an edit to build_template_workbook can not load a stale template)
+_TEMPLATES = {}
+
+def load_template_workbook(template=None):
+    """Fresh copy of the styled template workbook.
+
+    The built-in template (or a customer .xlsx with "Clash Report" and
+    "Clash_Points" header rows) is prepared once per process and kept in
+    memory; each export unpickles its own copy. Changing a layout constant
+    or the template file changes the signature, so it is prepared again.
+    """
+    template = template or getattr(config, "EXCEL_TEMPLATE", None)
+    key = template_signature(template)
+    if key not in _TEMPLATES:
+        if template:
+            wb = load_workbook(template)
+            for name in ("Clash Report", "Clash_Points"):
+                sheet = wb[name]
+                if sheet.max_row > 1:
+                    sheet.delete_rows(2, sheet.max_row - 1)
+        else:
+            wb = build_template_workbook()
+        _TEMPLATES[key] = pickle_workbook(wb)
+    return pickle.loads(_TEMPLATES[key])
+
+# ---------- Rows ----------
+def row_values(rec):
+    """Cell values for columns A..G of the main sheet."""
+    return [rec["rfi_no"], rec["test_name"], rec["group_name"], rec["clash_details"],
+            rec["item1"], rec["item2"], rec["item2_name"]]
+
+# ---------- Proximity clusters ----------
+def cluster_summary(records):
+    """One CLUSTER_HEADERS row per cluster."""
+    members = {}
+    for rec in records:
+        if rec.get("cluster"):
+            members.setdefault(rec["cluster"], []).append(rec)
+    rows = []
+    for number in sorted(members):
+        group = members[number]
+        xs, ys, zs = zip(*(rec["point"] for rec in group))
+        extent = sum((max(v) - min(v)) ** 2 for v in (xs, ys, zs)) ** 0.5
+        rows.append([number, len(group),
+                     ", ".join(dict.fromkeys(rec["test_name"] for rec in group)),
+                     ", ".join(str(rec["rfi_no"]) for rec in group),
+                     round(sum(xs) / len(xs), 3), round(sum(ys) / len(ys), 3), round(sum(zs) / len(zs), 3),
+                     round(extent, 3)])
+    return rows
+
+def image_cell_size_px():
+    return col_width_to_pixels(COL_WIDTHS[IMAGE_COL]), row_height_to_pixels(DATA_ROW_HEIGHT)
+
+# ---------- Thumbnails and incremental re-export ----------
+def image_hash(img_path: Path):
+    """Hash of the source image plus the thumbnail geometry it is rendered at."""
+    h = hashlib.sha1(repr((image_cell_size_px(), IMAGE_PADDING_PX)).encode("utf-8"))
+    with open(img_path, "rb") as f:
+        h.update(f.read())
+    return h.hexdigest()
+
+def image_stamp_text(img_path: Path):
+    """Thumbnail geometry plus the source image's size and mtime: its identity without reading it."""
+    stamp = image_stamp(img_path)
+    if stamp is None:
+        return ""
+    (w, h), (size, mtime_ns) = image_cell_size_px(), stamp
+    return f"{w}x{h}-{IMAGE_PADDING_PX}:{size}:{mtime_ns}"
+
+def state_values(rec):
+    return [register_key(rec), rec["rfi_no"], rec["status"], rec["distance"], rec["img_hash"], rec["img_stamp"]]
+
+def user_values(rec):
+    """Cell values for the user-entered columns I..J (placeholder unless merged)."""
+    return [rec.get("user_images", "(user images)"), rec.get("comments", "")]
+
+def _resolve_part(source_part, target):
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source_part), target))
+
+def _read_rels(zf, part):
+    rels_path = posixpath.join(posixpath.dirname(part), "_rels", posixpath.basename(part) + ".rels")
+    if rels_path not in zf.namelist():
+        return {}
+    root = ET.fromstring(zf.read(rels_path))
+    return {rel.get("Id"): _resolve_part(part, rel.get("Target"))
+            for rel in root.iter(f"{{{NS_PKG_REL}}}Relationship")}
+
+def read_sheet_images(zf, sheet_name):
+    """{(row, col) (1-based): [image bytes]} for the pictures anchored on one sheet of an open .xlsx."""
+    wb_root = ET.fromstring(zf.read("xl/workbook.xml"))
+    wb_rels = _read_rels(zf, "xl/workbook.xml")
+    sheet_part = None
+    for sheet in wb_root.iter(f"{{{NS_MAIN}}}sheet"):
+        if sheet.get("name") == sheet_name:
+            sheet_part = wb_rels.get(sheet.get(f"{{{NS_REL}}}id"))
+    if sheet_part is None:
+        return {}
+    sheet_rels = _read_rels(zf, sheet_part)
+    images = {}
+    for drawing in ET.fromstring(zf.read(sheet_part)).iter(f"{{{NS_MAIN}}}drawing"):
+        drawing_part = sheet_rels.get(drawing.get(f"{{{NS_REL}}}id"))
+        drawing_rels = _read_rels(zf, drawing_part)
+        for anchor in ET.fromstring(zf.read(drawing_part)):
+            row = anchor.findtext(f"{{{NS_XDR}}}from/{{{NS_XDR}}}row")
+            col = anchor.findtext(f"{{{NS_XDR}}}from/{{{NS_XDR}}}col")
+            blip = anchor.find(f".//{{{NS_A}}}blip")
+            if row is None or col is None or blip is None:
+                continue
+            media = drawing_rels.get(blip.get(f"{{{NS_REL}}}embed"))
+            if media:
+                images.setdefault((int(row) + 1, int(col) + 1), []).append(zf.read(media))
+    return images
+
+def load_previous_export(path, merge=False):
+    """{clash key: state} from a previous export.
+
+    Each state holds the row's reusable thumbnail and the user-entered
+    columns (User Images text and pictures, Comments). Keys are the
+    clash_core.register_key values of the Export_State sheet; rows it does
+    not cover (e.g. a workbook from before Export_State) are keyed on test +
+    clash name from the Clash Report sheet. Rows are located by RFI No, so a
+    table the engineers re-sorted in Excel still matches. Sheets are read in
+    read-only streaming mode, so this stays linear in the row count.
+    With merge=True a workbook that cannot be read raises ValueError rather
+    than being overwritten without its user columns.
+    """
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        prev_wb = load_workbook(path, read_only=True)
+        states = {}
+        if STATE_SHEET in prev_wb.sheetnames:
+            n = len(STATE_HEADERS)
+            for values in prev_wb[STATE_SHEET].iter_rows(min_row=2, max_col=n, values_only=True):
+                # Workbooks from before the Image Stamp column have fewer values
+                key, rfi_no, status, distance, img_hash, img_stamp = (tuple(values) + (None,) * n)[:n]
+                if key:
+                    states[key] = {"rfi_no": rfi_no, "status": status, "distance": distance,
+                                   "img_hash": img_hash or "", "img_stamp": img_stamp or ""}
+        else:
+            print(f"No {STATE_SHEET} sheet in {path.name}; matching rows on test and clash name")
+        rows_by_rfi, rfi_by_name = {}, {}
+        for row, values in enumerate(prev_wb["Clash Report"].iter_rows(
+                min_row=2, max_col=COMMENTS_COL, values_only=True), start=2):
+            values = (tuple(values) + (None,) * COMMENTS_COL)[:COMMENTS_COL]
+            rows_by_rfi[values[0]] = (row, values[USER_IMAGES_COL - 1:COMMENTS_COL])
+            # Clash Details: "Clash Group: ...", "Between: ...", "", clash name, ...
+            details = str(values[3] or "").split("\n")
+            if len(details) > 3:
+                rfi_by_name[f"{values[1]}|{details[3]}"] = values[0]
+        prev_wb.close()
+        with zipfile.ZipFile(path) as zf:
+            images = read_sheet_images(zf, "Clash Report")
+    except Exception as e:
+        if merge:
+            raise ValueError(f"Could not read the user columns of {path} ({e}); not overwriting it") from e
+        print(f"Could not read previous export {path}: {e}")
+        return {}
+    covered = {state["rfi_no"] for state in states.values()}
+    for key, rfi_no in rfi_by_name.items():
+        if rfi_no not in covered and key not in states:
+            states[key] = {"rfi_no": rfi_no, "status": None, "distance": None, "img_hash": "", "img_stamp": ""}
+    for state in states.values():
+        row, (user_images, comments) = rows_by_rfi.get(state["rfi_no"], (None, (None, None)))
+        state["thumbnail"] = (images.get((row, IMAGE_COL)) or [None])[0]
+        state["user_images"], state["comments"] = user_images, comments
+        state["user_image_data"] = images.get((row, USER_IMAGES_COL), [])
+    return states
+
+def previous_state(previous, rec):
+    """rec's state in a previous export: by clash_core.register_key, else by test + clash name."""
+    return previous.get(register_key(rec)) or previous.get(f"{rec['test_name']}|{rec['clash_name']}")
+
+def carry_over_user_columns(records, previous):
+    """Copy User Images / Comments (text and pasted pictures) from the previous export (see previous_state)."""
+    carried = 0
+    for rec in records:
+        prev = previous_state(previous, rec)
+        if prev is None:
+            continue
+        rec["user_images"] = prev["user_images"] if prev["user_images"] is not None else ""
+        rec["comments"] = prev["comments"] if prev["comments"] is not None else ""
+        rec["user_image_data"] = prev["user_image_data"]
+        carried += 1
+    print(f"Merge: user columns carried over for {carried} of {len(records)} clashes")
+    return records
+
+def add_thumbnails(records, previous=None):
+    """Set rec["img_stamp"], rec["img_hash"] and rec["thumbnail"], reusing unchanged previous thumbnails.
+
+    An image is unchanged when its stamp (size and mtime) matches the
+    previous export's. Only images whose stamp differs are read and hashed,
+    and only for an incremental export (previous given); a plain export
+    records stamps alone.
+    """
+    incremental = previous is not None
+    previous = previous or {}
+    target_w_px, target_h_px = image_cell_size_px()
+    counts = {"new": 0, "changed": 0, "unchanged": 0, "resized": 0, "reused": 0}
+    ready = []
+    matched = set()
+    for rec in records:
+        img_path = rec["img_path"]
+        rec["img_stamp"] = image_stamp_text(img_path) if img_path else ""
+        prev = previous_state(previous, rec)
+        if prev is not None:
+            matched.add(id(prev))
+        if prev and rec["img_stamp"] and prev["img_stamp"] == rec["img_stamp"]:
+            rec["img_hash"], same_image = prev["img_hash"], True
+        elif not img_path:
+            rec["img_hash"] = ""
+            same_image = bool(prev) and not prev["img_hash"] and not prev["img_stamp"]
+        else:
+            rec["img_hash"] = image_hash(img_path) if incremental else ""
+            same_image = bool(prev and rec["img_hash"] and prev["img_hash"] == rec["img_hash"])
+        if prev is None:
+            counts["new"] += 1
+        elif same_image and (prev["status"], prev["distance"]) == (rec["status"], rec["distance"]):
+            counts["unchanged"] += 1
+        else:
+            counts["changed"] += 1
+        reuse = bool(img_path and prev and same_image and prev["thumbnail"])
+        ready.append(prev["thumbnail"] if reuse else None)
+        if img_path:
+            counts["reused" if reuse else "resized"] += 1
+    thumbnails = prepare_thumbnails([rec["img_path"] for rec in records], target_w_px - IMAGE_PADDING_PX,
+                                    target_h_px - IMAGE_PADDING_PX, ready=ready)
+    for rec, thumbnail in zip(records, thumbnails):
+        rec["thumbnail"] = thumbnail
+    if previous:
+        counts["removed"] = len(previous) - len(matched)
+        print("Incremental: {new} new, {changed} changed, {unchanged} unchanged, {removed} removed; "
+              "{resized} images resized, {reused} reused".format(**counts))
+    return records
+
+# ---------- openpyxl backend ----------
+def add_summary_sheet_openpyxl(wb, title, headers, col_widths, rows):
+    """Plain sheet with a styled header row and frozen panes."""
+    ws = wb.create_sheet(title=title)
+    for col_idx, w in col_widths.items():
+        ws.column_dimensions[get_column_letter(col_idx)].width = w
     ws.append(headers)
-
     ws.row_dimensions[1].height = HEADER_HEIGHT
     header_fill = PatternFill(start_color=HEADER_FILL, end_color=HEADER_FILL, fill_type="solid")
     header_font = Font(color=HEADER_FONT_COLOR, bold=True)
     header_align = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    for c_idx in range(1, len(headers) + 1):
-        cell = ws.cell(row=1, column=c_idx)
+    for cell in ws[1]:
         cell.fill = header_fill
         cell.font = header_font
         cell.alignment = header_align
+    for row in rows:
+        ws.append(row)
+    ws.freeze_panes = "A2"
+    return ws
+
+def write_workbook_openpyxl(records, output_file, template=None, extra_sheets=()):
+    wb = load_template_workbook(template)
+    ws = wb["Clash Report"]
+    cp = wb["Clash_Points"]
 
     start_data_row = 2
     current_row = start_data_row
-    temp_images = []
-
-    # ---------- Handle both clashresult and clashgroup ----------
-    clashes = root.findall(".//clashresult")
-    clash_mode = "result"
-    if not clashes:
-        clashes = root.findall(".//clashgroup")
-        clash_mode = "group"
-
-    for i, clash in enumerate(clashes, start=1):
-        test_name = "Unknown Test"
-        group_name = "None"
-
-        if clash_mode == "group":
-            parent_test = clash.find("../..")
-            test_name = parent_test.get("name", "Unknown Test") if parent_test is not None else "Unknown Test"
-            group_name = clash.get("name", "None")
-        else:
-            clash_guid = clash.get("guid")
-            for test in root.findall(".//clashtest"):
-                for cr in test.findall(".//clashresult"):
-                    if clash_guid and cr.get("guid") == clash_guid:
-                        test_name = test.get("name", "Unknown Test")
-                        break
-                if test_name != "Unknown Test":
-                    break
-
-        clash_group = f"{group_name}, {test_name}" if group_name != "None" else test_name
-
-        # ---------- Clash details ----------
-        clash_name = clash.get("name", f"Clash{i}")
-        distance = clash.get("distance", "N/A")
-        pos = clash.find(".//pos3f")
-        coords_text = ""
-        if pos is not None:
-            try:
-                x_val = float(pos.get("x") or 0.0)
-                y_val = float(pos.get("y") or 0.0)
-                z_val = float(pos.get("z") or 0.0)
-                coords_text = f"{x_val:.3f}m,\n{y_val:.3f}m,\n{z_val:.3f}m"
-            except Exception:
-                coords_text = ""
-
-        objs = clash.findall(".//clashobject")
-        item1_text = get_item_details(objs[0]) if len(objs) > 0 else ""
-        item2_text = get_item_details(objs[1]) if len(objs) > 1 else ""
-        item2_name = get_item_name_short(item2_text)
-
-        between_line = f"Between: {get_item_name_short(item1_text)} and {item2_name}\n"
-        clash_details = (
-            f"Clash Group: {clash_group}\n"
-            f"{between_line}\n"
-            f"{clash_name}\n"
-            f"Distance: {distance}m\n"
-            f"Clash Point:\n{coords_text}"
-        )
+    last_row = start_data_row + len(records) - 1 if records else 1
 
+    # Borders are assigned as each row is written; only three row kinds exist
+    body_borders = build_row_borders(False, False)
+    last_borders = build_row_borders(False, True)
+    if last_row == 1:
+        for c_idx, border in enumerate(build_row_borders(True, True), start=1):
+            ws.cell(row=1, column=c_idx).border = border
+
+    data_align = Alignment(wrap_text=True, vertical="top")
+    data_font = Font(color="000000")
+
+    for rec in records:
         # ---------- Write to Excel ----------
-        ws.cell(row=current_row, column=1, value=i)
-        ws.cell(row=current_row, column=2, value=test_name)
-        ws.cell(row=current_row, column=3, value=group_name)
-        ws.cell(row=current_row, column=4, value=clash_details)
-        ws.cell(row=current_row, column=5, value=item1_text)
-        ws.cell(row=current_row, column=6, value=item2_text)
-        ws.cell(row=current_row, column=7, value=item2_name)
-
-        href_raw = clash.get("href") or ""
-        img_path = find_image_file(href_raw, xml_path)
-        if img_path:
-            col_w = COL_WIDTHS[8]
-            target_w_px = col_width_to_pixels(col_w)
-            target_h_px = row_height_to_pixels(DATA_ROW_HEIGHT)
-            tmp_img = resize_image_for_cell(img_path, target_w_px, target_h_px, padding_px=IMAGE_PADDING_PX)
-            if tmp_img:
-                try:
-                    img_obj = XLImage(str(tmp_img))
-                    anchor_cell = f"{get_column_letter(8)}{current_row}"
-                    ws.add_image(img_obj, anchor_cell)
-                    temp_images.append(tmp_img)
-                except Exception:
-                    ws.cell(row=current_row, column=8, value=str(img_path))
-            else:
-                ws.cell(row=current_row, column=8, value=str(img_path))
+        for c, value in enumerate(row_values(rec), start=1):
+            ws.cell(row=current_row, column=c, value=value)
+
+        img_path = rec["img_path"]
+        if rec["thumbnail"]:
+            try:
+                img_obj = XLImage(BytesIO(rec["thumbnail"]))
+                anchor_cell = f"{get_column_letter(IMAGE_COL)}{current_row}"
+                ws.add_image(img_obj, anchor_cell)
+            except Exception:
+                ws.cell(row=current_row, column=IMAGE_COL, value=str(img_path))
+        elif img_path:
+            ws.cell(row=current_row, column=IMAGE_COL, value=str(img_path))
         else:
-            ws.cell(row=current_row, column=8, value=href_raw or "")
+            ws.cell(row=current_row, column=IMAGE_COL, value=rec["href"])
 
-        ws.cell(row=current_row, column=9, value="(user images)")
-        ws.cell(row=current_row, column=10, value="")
+        for c, value in enumerate(user_values(rec), start=USER_IMAGES_COL):
+            ws.cell(row=current_row, column=c, value=value)
+        for data in rec.get("user_image_data", []):
+            ws.add_image(XLImage(BytesIO(data)), f"{get_column_letter(USER_IMAGES_COL)}{current_row}")
 
         # ---------- Row formatting ----------
         ws.row_dimensions[current_row].height = DATA_ROW_HEIGHT
-        offset = current_row - start_data_row
+        row_borders = last_borders if current_row == last_row else body_borders
         for c in range(1, 11):
             cell = ws.cell(row=current_row, column=c)
-            cell.alignment = Alignment(wrap_text=True, vertical="top")
-            cell.font = Font(color="000000")
-            if (offset % 2) == 0:
-                cell.fill = PatternFill(start_color=ALT_ROW_FILL, end_color=ALT_ROW_FILL, fill_type="solid")
+            cell.alignment = data_align
+            cell.font = data_font
+            cell.border = row_borders[c - 1]
 
         current_row += 1
 
     # ---------- Table formatting ----------
-    last_row = current_row - 1
+    table = ws.tables.get(TABLE_NAME)
     if last_row >= start_data_row:
+        # Alternate-row fill as one sheet-level rule (first data row filled)
+        alt_fill = PatternFill(start_color=ALT_ROW_FILL, end_color=ALT_ROW_FILL, fill_type="solid")
+        ws.conditional_formatting.add(
+            f"A{start_data_row}:J{last_row}",
+            FormulaRule(formula=[f"MOD(ROW()-{start_data_row},2)=0"], fill=alt_fill))
         table_ref = f"A1:J{last_row}"
-        table = Table(displayName=TABLE_NAME, ref=table_ref)
-        style = TableStyleInfo(name="TableStyleMedium9", showFirstColumn=False,
-                               showLastColumn=False, showRowStripes=False, showColumnStripes=False)
-        table.tableStyleInfo = style
-        ws.add_table(table)
+        if table is None:
+            table = Table(displayName=TABLE_NAME, ref=table_ref)
+            table.tableStyleInfo = table_style_info()
+            ws.add_table(table)
+        table.ref = table_ref
+        if table.autoFilter is not None:
+            table.autoFilter.ref = table_ref
+    elif table is not None:
+        del ws.tables[TABLE_NAME]
 
-    # ---------- Borders ----------
-    thick = Side(style="thick", color="000000")
-    double = Side(style="double", color="000000")
-    for r in range(1, last_row + 1):
-        for c in range(1, 11):
-            if r == 1:
-                top = thick
+    # ---------- Clash Points Sheet ----------
+    for row_index, rec in enumerate(records, start=2):
+        cp.cell(row=row_index, column=1, value=rec["rfi_no"])
+        cp.cell(row=row_index, column=2, value=rec["test_name"])
+        cp.cell(row=row_index, column=3, value=rec["clash_name"])
+        if rec["point"] is not None:
+            for ci, v in enumerate(rec["point"], start=4):
+                cp.cell(row=row_index, column=ci, value=v)
+        if rec.get("cluster"):
+            cp.cell(row=row_index, column=CP_CLUSTER_COL, value=rec["cluster"])
+        if rec.get("nearby"):
+            cp.cell(row=row_index, column=CP_NEARBY_COL, value=rec["nearby"])
+        if rec.get("age_days") is not None:
+            cp.cell(row=row_index, column=CP_AGE_COL, value=rec["age_days"])
+
+    clusters = cluster_summary(records)
+    if clusters:
+        add_summary_sheet_openpyxl(wb, CLUSTER_SHEET, CLUSTER_HEADERS, CLUSTER_COL_WIDTHS, clusters)
+    for title, headers, col_widths, rows in extra_sheets:
+        add_summary_sheet_openpyxl(wb, title, headers, col_widths, rows)
+
+    # ---------- Export state (hidden) ----------
+    st = wb.create_sheet(title=STATE_SHEET)
+    st.sheet_state = "hidden"
+    st.append(STATE_HEADERS)
+    for rec in records:
+        st.append(state_values(rec))
+
+    # Parts are deflated in parallel and assembled into the zip in one pass
+    save_workbook(wb, output_file)
+
+# ---------- xlsxwriter backend ----------
+def add_summary_sheet_xlsxwriter(wb, title, headers, col_widths, rows, header_fmt):
+    """xlsxwriter counterpart of add_summary_sheet_openpyxl."""
+    ws = wb.add_worksheet(title)
+    for col_idx, w in col_widths.items():
+        ws.set_column(col_idx - 1, col_idx - 1, w)
+    ws.set_row(0, HEADER_HEIGHT)
+    ws.write_row(0, 0, headers, header_fmt)
+    date_fmt = None
+    for r, row in enumerate(rows, start=1):
+        for c, value in enumerate(row):
+            if isinstance(value, datetime.date):
+                date_fmt = date_fmt or wb.add_format({"num_format": "yyyy-mm-dd"})
+                ws.write_datetime(r, c, value, date_fmt)
+            else:
+                ws.write(r, c, value)
+    ws.freeze_panes(1, 0)
+    return ws
+
+def add_table_constant_memory(ws, first_row, first_col, last_row, last_col, options):
+    """add_table() for a constant_memory worksheet.
+
+    xlsxwriter refuses tables in constant_memory mode because table data may
+    land on rows that were already flushed. Declared before any row is written
+    and without a 'data' option, the table only touches its header row, so the
+    restriction is lifted for that one call (the header is rewritten after).
+    """
+    ws.constant_memory = False
+    try:
+        ws.add_table(first_row, first_col, last_row, last_col, options)
+    finally:
+        ws.constant_memory = True
+
+def write_workbook_xlsxwriter(records, output_file, template=None, extra_sheets=()):
+    """Same workbook as the openpyxl backend, streamed row by row in constant_memory mode."""
+    if template or getattr(config, "EXCEL_TEMPLATE", None):
+        raise ValueError("Workbook templates are only supported by the openpyxl backend")
+    try:
+        import xlsxwriter
+    except ImportError:
+        raise ImportError("The xlsxwriter backend needs 'pip install xlsxwriter'")
+
+    wb = xlsxwriter.Workbook(str(output_file), {"constant_memory": True})
+    ws = wb.add_worksheet("Clash Report")
+
+    header_style = {"bg_color": f"#{HEADER_FILL}", "font_color": f"#{HEADER_FONT_COLOR}", "bold": True,
+                    "align": "center", "valign": "vcenter", "text_wrap": True}
+    data_style = {"font_color": "#000000", "valign": "top", "text_wrap": True}
+    # xlsxwriter border codes: 5 = thick, 6 = double
+    format_cache = {}
+
+    def cell_format(base, is_first, is_last, col):
+        key = (id(base), is_first, is_last, col)
+        if key not in format_cache:
+            props = dict(base)
+            props.update({"top": 5 if is_first else 6, "bottom": 5 if is_last else 6,
+                          "left": 5 if col == 1 else 6, "right": 5 if col == 10 else 6})
+            format_cache[key] = wb.add_format(props)
+        return format_cache[key]
+
+    for col_idx, w in COL_WIDTHS.items():
+        ws.set_column(col_idx - 1, col_idx - 1, w)
+
+    start_data_row = 2
+    last_row = start_data_row + len(records) - 1 if records else 1
+
+    if last_row >= start_data_row:
+        add_table_constant_memory(ws, 0, 0, last_row - 1, len(HEADERS) - 1, {
+            "name": TABLE_NAME,
+            "style": "Table Style Medium 9",
+            "banded_rows": False,
+            "columns": [{"header": h, "header_format": cell_format(header_style, True, False, c)}
+                        for c, h in enumerate(HEADERS, start=1)],
+        })
+        alt_fmt = wb.add_format({"bg_color": f"#{ALT_ROW_FILL}", "pattern": 1})
+        ws.conditional_format(start_data_row - 1, 0, last_row - 1, len(HEADERS) - 1, {
+            "type": "formula",
+            "criteria": f"=MOD(ROW()-{start_data_row},2)=0",
+            "format": alt_fmt,
+        })
+    # Header cells are (re)written in constant_memory form after the table exists
+    ws.set_row(0, HEADER_HEIGHT)
+    for c, h in enumerate(HEADERS, start=1):
+        ws.write_string(0, c - 1, h, cell_format(header_style, True, last_row == 1, c))
+
+    for r, rec in enumerate(records, start=start_data_row):
+        is_last = r == last_row
+        values = row_values(rec) + [None] + user_values(rec)
+        img_path = rec["img_path"]
+        img_data = rec["thumbnail"]
+        if not img_data:
+            values[IMAGE_COL - 1] = str(img_path) if img_path else rec["href"]
+
+        ws.set_row(r - 1, DATA_ROW_HEIGHT)
+        for c, value in enumerate(values, start=1):
+            fmt = cell_format(data_style, False, is_last, c)
+            if value is None:
+                ws.write_blank(r - 1, c - 1, None, fmt)
             else:
-                top = double
-            bottom = thick if r == last_row else double
-            left = thick if c == 1 else double
-            right = thick if c == 10 else double
-            ws.cell(row=r, column=c).border = Border(left=left, right=right, top=top, bottom=bottom)
+                ws.write(r - 1, c - 1, value, fmt)
+        if img_data:
+            ws.insert_image(r - 1, IMAGE_COL - 1, str(img_path),
+                            {"image_data": BytesIO(img_data), "object_position": 2})
+        for n, data in enumerate(rec.get("user_image_data", []), start=1):
+            ws.insert_image(r - 1, USER_IMAGES_COL - 1, f"user_image_{r}_{n}.png",
+                            {"image_data": BytesIO(data), "object_position": 2})
 
     # ---------- Clash Points Sheet ----------
-    cp = wb.create_sheet(title="Clash_Points")
-    cp_headers = ["ID", "Group", "Clash Name", "X", "Y", "Z"]
-    cp.append(cp_headers)
-    cp.row_dimensions[1].height = HEADER_HEIGHT
-    for ci in range(1, len(cp_headers) + 1):
-        cell = cp.cell(row=1, column=ci)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_align
+    cp = wb.add_worksheet("Clash_Points")
+    cp_header_fmt = wb.add_format(header_style)
+    for col_idx, w in CP_COL_WIDTHS.items():
+        cp.set_column(col_idx - 1, col_idx - 1, w)
+    cp.set_row(0, HEADER_HEIGHT)
+    cp.write_row(0, 0, CP_HEADERS, cp_header_fmt)
+    for r, rec in enumerate(records, start=1):
+        cp.write_row(r, 0, [rec["rfi_no"], rec["test_name"], rec["clash_name"]])
+        if rec["point"] is not None:
+            cp.write_row(r, 3, rec["point"])
+        if rec.get("cluster"):
+            cp.write_number(r, CP_CLUSTER_COL - 1, rec["cluster"])
+        if rec.get("nearby"):
+            cp.write_string(r, CP_NEARBY_COL - 1, rec["nearby"])
+        if rec.get("age_days") is not None:
+            cp.write_number(r, CP_AGE_COL - 1, rec["age_days"])
+
+    clusters = cluster_summary(records)
+    if clusters:
+        add_summary_sheet_xlsxwriter(wb, CLUSTER_SHEET, CLUSTER_HEADERS, CLUSTER_COL_WIDTHS, clusters,
+                                     cp_header_fmt)
+    for title, headers, col_widths, rows in extra_sheets:
+        add_summary_sheet_xlsxwriter(wb, title, headers, col_widths, rows, cp_header_fmt)
+
+    # ---------- Export state (hidden) ----------
+    st = wb.add_worksheet(STATE_SHEET)
+    st.hide()
+    st.write_row(0, 0, STATE_HEADERS)
+    for r, rec in enumerate(records, start=1):
+        st.write_row(r, 0, state_values(rec))
+
+    wb.close()
+
+WRITERS = {
+    "openpyxl": write_workbook_openpyxl,
+    "xlsxwriter": write_workbook_xlsxwriter,
+}
 
-    row_index = 2
-    for i, clash in enumerate(clashes, start=1):
-        clash_group = "Unknown Group"
-        for test in root.findall(".//clashtest"):
-            if clash in test.findall(".//clashresult") or clash in test.findall(".//clashgroup"):
-                clash_group = test.get("name", "Unknown Group")
-                break
-        clash_name = clash.get("name", f"Clash{i}")
-        pos = clash.find(".//pos3f")
-        if pos is not None:
-            x_val = float(pos.get("x") or 0.0)
-            y_val = float(pos.get("y") or 0.0)
-            z_val = float(pos.get("z") or 0.0)
-        else:
-            x_val = y_val = z_val = None
-        cp.cell(row=row_index, column=1, value=i)
-        cp.cell(row=row_index, column=2, value=clash_group)
-        cp.cell(row=row_index, column=3, value=clash_name)
-        if x_val is not None:
-            cp.cell(row=row_index, column=4, value=round(x_val, 3))
-            cp.cell(row=row_index, column=5, value=round(y_val, 3))
-            cp.cell(row=row_index, column=6, value=round(z_val, 3))
-        row_index += 1
-
-    cp.column_dimensions['A'].width = 6
-    cp.column_dimensions['B'].width = 18
-    cp.column_dimensions['C'].width = 25
-    cp.column_dimensions['D'].width = 12
-    cp.column_dimensions['E'].width = 12
-    cp.column_dimensions['F'].width = 12
-
-    wb.save(output_file)
+# ---------- Main export function ----------
+def export_to_excel(xml_file, output_file, backend=None, template=None, incremental=False, merge=False,
+                    register=None, dedupe=None, cluster_radius=None, nearby_radius=None, top_k=None,
+                    per_test=False, where=None):
+    """Write the clash workbook (clash_core.load_report, excel_sheets, then the write_excel job).
+
+    incremental=True compares the report with the workbook already at
+    output_file (by clash key, status, distance and image) and reuses its
+    thumbnails for clashes whose image did not change.
+    merge=True carries the User Images and Comments columns of the workbook
+    already at output_file over to the same clashes (matched by guid, else
+    test + clash name); a workbook whose columns cannot be read is not
+    overwritten.
+    register (default config.RFI_REGISTER) is a SQLite RFI register giving
+    each clash a permanent RFI number across reports (see
+    clash_core.register_key).
+    dedupe (default config.DEDUPE_ACROSS_TESTS) collapses clashes between the
+    same two objects in several tests into one row.
+    cluster_radius (default config.CLUSTER_RADIUS, metres) groups clashes
+    chained within that distance into numbered clusters (Clash_Points
+    "Cluster" column and a Clusters sheet); None turns clustering off.
+    nearby_radius (default config.NEARBY_RADIUS, metres) fills the
+    Clash_Points "Nearby Clashes" column.
+    top_k keeps only the top_k most severe clashes (most negative distance;
+    top_k per test with per_test=True), in severity order. The report is
+    streamed through a bounded heap, so only those clashes are held and
+    only their images are resized.
+    where (default config.CLASH_FILTER) is a clash_reader filter expression,
+    e.g. "status=new,active; test=Storm*; distance<=-0.02". It is evaluated
+    in the reader, so excluded clashes are never formatted or have their
+    images looked up.
+    """
+    xml_path = Path(xml_file)
+    if not xml_path.exists():
+        print(f"XML file not found: {xml_file}")
+        return
+
+    backend = backend or getattr(config, "EXCEL_BACKEND", "openpyxl")
+    if backend not in WRITERS:
+        raise ValueError(f"Unknown Excel backend '{backend}' (choose from {', '.join(WRITERS)})")
+
+    report = load_report(xml_path, where=where, top_k=top_k, per_test=per_test, dedupe=dedupe, register=register)
+    jobs, _ = plan_excel(report, output_file, backend=backend, template=template, incremental=incremental,
+                         merge=merge, cluster_radius=cluster_radius, nearby_radius=nearby_radius)
+    run_jobs(jobs)
+
+def write_excel(backend, records, output_file, template=None, extra_sheets=(), incremental=False, merge=False):
+    """The Excel job: thumbnails, user columns (merge), then the backend's writer.
+
+    Runs in a worker process next to the other renderers' jobs, so images
+    are resized (or reused from the previous export with incremental) in
+    parallel with them and never pickled from the parent.
+    """
+    previous = load_previous_export(output_file, merge) if incremental or merge else None
+    add_thumbnails(records, previous if incremental else None)
+    if merge and previous:
+        carry_over_user_columns(records, previous)
+    WRITERS[backend](records, output_file, template=template, extra_sheets=extra_sheets)
     print(f"Saved: {output_file}")
 
-    # ---------- Cleanup temp images ----------
-    for t in temp_images:
-        try:
-            os.remove(t)
-        except Exception:
-            pass
+def plan_excel(report, output_path, backend=None, template=None, incremental=False, merge=False,
+               cluster_radius=None, nearby_radius=None, **_):
+    """clash_core renderer plugin for .xlsx: one job making the thumbnails and writing the workbook."""
+    backend = backend or getattr(config, "EXCEL_BACKEND", "openpyxl")
+    if backend not in WRITERS:
+        raise ValueError(f"Unknown Excel backend '{backend}' (choose from {', '.join(WRITERS)})")
+    extra_sheets = excel_sheets(report, cluster_radius, nearby_radius)
+    args = (backend, report["records"], output_path, template, extra_sheets, incremental, merge)
+    return [(write_excel, args)], lambda: None
+
+def excel_sheets(report, cluster_radius=None, nearby_radius=None):
+    """The workbook-only sheet data of a clash_core.load_report report; returns its extra sheets.
+
+    Sets each record's age, cluster and nearby clashes. Thumbnails are left
+    to the write_excel job.
+    """
+    records, block, clashes = report["records"], report["block"], report["clashes"]
+    # Creation dates of the whole report in one datetime64 array; ages as of the report's date
+    created = created_array(clashes)
+    report_time = datetime.datetime.fromtimestamp(report["xml_path"].stat().st_mtime)
+    ages = ages_days(created, report_time)
+    for rec in records:
+        rec["age_days"] = ages[rec["row"]]
+    timeline_headers, timeline_rows = timeline(created, [clash["status"] for clash in clashes])
+    extra_sheets = [(SUMMARY_SHEET, SUMMARY_HEADERS, SUMMARY_COL_WIDTHS, report["summary_rows"]),
+                    (TIMELINE_SHEET, timeline_headers, timeline_col_widths(timeline_headers), timeline_rows),
+                    (EXTENT_SHEET, EXTENT_HEADERS, EXTENT_COL_WIDTHS, block.test_extents()),
+                    (HOT_SHEET, HOT_HEADERS, HOT_COL_WIDTHS, report["summary"].objects.rows())]
+    cluster_radius = cluster_radius or getattr(config, "CLUSTER_RADIUS", None)
+    if cluster_radius:
+        assign_clusters(records, cluster_radius)
+    nearby_radius = nearby_radius or getattr(config, "NEARBY_RADIUS", None)
+    if nearby_radius:
+        add_nearby_clashes(records, nearby_radius)
+    return extra_sheets
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a Navisworks clash XML to a styled Excel workbook")
+    parser.add_argument("xml_file", nargs="?", default=config.XML_FILE)
+    parser.add_argument("output_file", nargs="?", default=config.OUTPUT_FILE)
+    parser.add_argument("--backend", choices=list(WRITERS))
+    parser.add_argument("--template", help="branded .xlsx template (openpyxl backend)")
+    parser.add_argument("--incremental", action="store_true", help="reuse thumbnails of the existing output")
+    parser.add_argument("--merge", action="store_true", help="keep User Images / Comments of the existing output")
+    parser.add_argument("--cluster-radius", type=float)
+    parser.add_argument("--nearby-radius", type=float)
+    add_report_arguments(parser)
+    args = parser.parse_args()
+    export_to_excel(args.xml_file, args.output_file, backend=args.backend, template=args.template,
+                    incremental=args.incremental, merge=args.merge, register=args.register,
+                    dedupe=args.dedupe, cluster_radius=args.cluster_radius, nearby_radius=args.nearby_radius,
+                    top_k=args.top_k, per_test=args.per_test, where=args.where)
 
 if __name__ == "__main__":
-    export_to_excel(config.XML_FILE, config.OUTPUT_FILE)
+    main()
@@ -6,20 +6,31 @@ Parses clash XML and writes a formatted Word (.docx) document:
 - 8 columns with specific widths
 - First 5 columns populated like Excel export: RFI No, Clash Details, Item1, Item2, Clash Image
 - Images resized to fit cells
+- The report is read and numbered by clash_core.load_report (the same
+  records as the Excel export); plan_word is the .docx renderer plugin of
+  clash_core.export and makes its own thumbnails (prepare_thumbnails)
+- Large reports can be split into volumes (one per clash test and/or at most
+  N rows each), rendered in parallel worker processes, with an index
+  document linking to them
 """
 
-import xml.etree.ElementTree as ET
+import argparse
 from pathlib import Path
-import tempfile
-import os
+from urllib.parse import quote
+from copy import deepcopy
+from io import BytesIO
 from docx import Document
 from docx.shared import Cm, Pt, RGBColor
 from docx.enum.section import WD_ORIENT
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml import OxmlElement
 from docx.oxml.ns import qn
-from PIL import Image as PILImage
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.table import _Cell
 import config
+from package_writer import save_document
+from clash_core import add_report_arguments, get_item_name_short, load_report, prepare_thumbnails, run_jobs
+from clash_summary import SUMMARY_HEADERS
 
 # ---------- Layout constants ----------
 HEADER_FILL = "2C7676"
@@ -27,85 +38,16 @@ HEADER_FONT_SIZE = 12
 DATA_FONT_SIZE = 10
 HEADER_FONT_COLOR = (255, 255, 255)
 COL_WIDTHS_CM = [1, 4.5, 4.5, 4.5, 8, 8, 4.5, 4.5]  # match Excel-ish
+SUMMARY_COL_WIDTHS_CM = [4, 12, 3, 3]
+WORD_HEADERS = ["RFI No.", "Clash Details", "Item 1", "Item 2", "Clash Image", "Solution", "Description of Solution", "TSL comment"]
+INDEX_HEADERS = ["Volume", "Contents", "Clashes", "RFI No."]
+INDEX_COL_WIDTHS_CM = [9, 14, 3, 4]
 
 # Image cell max size (cm)
 IMG_MAX_W_CM = 7.5
 IMG_MAX_H_CM = 7.5
 
 # ---------- Helper functions ----------
-def find_image_file(href_raw: str, xml_path: Path):
-    if not href_raw:
-        return None
-    href = href_raw.replace("\\", "/").strip()
-    candidates = []
-    p = Path(href)
-    if p.is_absolute():
-        candidates.append(p)
-    xml_dir = xml_path.parent
-    candidates.append(xml_dir / href)
-    fname = Path(href).name
-    candidates.append(xml_dir / fname)
-    candidates.append(xml_dir / "ELV_files" / fname)
-    for cand in candidates:
-        try:
-            cand_resolved = cand.resolve()
-        except Exception:
-            cand_resolved = cand
-        if cand_resolved.exists():
-            return Path(cand_resolved)
-    return None
-
-def resize_image_for_cell(orig_path: Path, max_width_cm: float, max_height_cm: float):
-    try:
-        img = PILImage.open(orig_path)
-    except Exception as e:
-        print(f"Could not open image {orig_path}: {e}")
-        return None
-    # Word uses EMU internally; here we resize to fit roughly in cm
-    max_w_px = int(max_width_cm * 96 / 2.54)
-    max_h_px = int(max_height_cm * 96 / 2.54)
-    w, h = img.size
-    ratio = min(max_w_px / w, max_h_px / h, 1.0)
-    new_w, new_h = int(w * ratio), int(h * ratio)
-    img = img.resize((new_w, new_h), PILImage.LANCZOS)
-    tf = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-    tmp_path = Path(tf.name)
-    tf.close()
-    img.save(tmp_path)
-    return tmp_path
-
-def get_item_details(clash_object):
-    if clash_object is None:
-        return ""
-    tags = {}
-    for st in clash_object.findall(".//smarttag"):
-        name = st.findtext("name", "").strip()
-        val = st.findtext("value", "").strip()
-        if name:
-            tags[name] = val
-    lines = []
-    if tags.get("Item Name"):
-        lines.append(f"Item Name: {tags.get('Item Name')}")
-    if tags.get("Civil3D General:Network name"):
-        lines.append(f"Network: {tags.get('Civil3D General:Network name')}")
-    part = tags.get("Civil3D General:Part Size Name", "")
-    itype = tags.get("Item Type", "")
-    type_line = " ".join(filter(None, [part, itype])).strip()
-    if type_line:
-        lines.append(f"Item Type: {type_line}")
-    inner = tags.get("Civil3D General:Inner Diameter or Width", "")
-    outer = tags.get("Civil3D General:Outer Diameter or Width", "")
-    if inner or outer:
-        lines.append(f"Pipe {inner} x {outer}".strip())
-    return "\n".join(lines)
-
-def get_item_name_short(item_details_text):
-    for line in item_details_text.splitlines():
-        if line.startswith("Item Name:"):
-            return line.replace("Item Name:", "").strip()
-    first = item_details_text.splitlines()[0] if item_details_text else ""
-    return first or "Unknown"
-
 def set_cell_background(cell, fill_color):
     tc = cell._tc
     tcPr = tc.get_or_add_tcPr()
@@ -115,16 +57,152 @@ def set_cell_background(cell, fill_color):
     shd.set(qn('w:fill'), fill_color)
     tcPr.append(shd)
 
-# ---------- Main export ----------
-def export_to_word(xml_file, output_file):
-    xml_path = Path(xml_file)
-    if not xml_path.exists():
-        print(f"XML file not found: {xml_file}")
-        return
+def add_header_row(table, headers):
+    hdr_cells = table.rows[0].cells
+    for i, text in enumerate(headers):
+        p = hdr_cells[i].paragraphs[0]
+        run = p.add_run(text)
+        run.font.name = "Calibri"
+        run.font.size = Pt(HEADER_FONT_SIZE)
+        run.font.bold = True
+        run.font.color.rgb = RGBColor(*HEADER_FONT_COLOR)
+        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        set_cell_background(hdr_cells[i], HEADER_FILL)
+
+class RowBuilder:
+    """Bulk row appender for a python-docx table.
+
+    table.add_row().cells re-reads every row of the table to build the cell
+    list, so filling a table that way slows down quadratically. Here one
+    styled <w:tr> (column widths from the table grid) is built once, each row
+    is a deep copy of it with the text written straight into the lxml tree,
+    and the rows are appended to the <w:tbl> together in flush().
+    """
+
+    def __init__(self, table):
+        self.table = table
+        row = table.add_row()
+        self.template = row._tr
+        table._tbl.remove(self.template)
+        self.pending = []
+
+    def add_row(self, texts=()):
+        """Append one row with the given cell texts -> its python-docx cells."""
+        tr = deepcopy(self.template)
+        tcs = tr.tc_lst
+        for tc, text in zip(tcs, texts):
+            if text:
+                tc.p_lst[0].add_r().text = text     # "\n" -> <w:br/>, like cell.text
+        self.pending.append(tr)
+        return [_Cell(tc, self.table) for tc in tcs]
+
+    def flush(self):
+        self.table._tbl.extend(self.pending)
+        self.pending = []
+
+def add_summary_table(doc, before_table, rows):
+    """Summary heading and table, placed above before_table."""
+    heading = doc.add_paragraph()
+    run = heading.add_run("Summary")
+    run.font.size = Pt(HEADER_FONT_SIZE)
+    run.font.bold = True
+    table = doc.add_table(rows=1, cols=len(SUMMARY_HEADERS))
+    table.autofit = False
+    for i, w in enumerate(SUMMARY_COL_WIDTHS_CM):
+        table.columns[i].width = Cm(w)
+    add_header_row(table, SUMMARY_HEADERS)
+    builder = RowBuilder(table)
+    for row in rows:
+        builder.add_row(["" if value is None else f"{value:.1%}" if isinstance(value, float) else str(value)
+                         for value in row])
+    builder.flush()
+    spacer = doc.add_paragraph()
+    for elem in (heading._p, table._tbl, spacer._p):
+        before_table._tbl.addprevious(elem)
+    return table
+
+# ---------- Rows ----------
+def word_rows_from_records(records, block):
+    """One plain dict per table row from the report's records (block row n is records[n]).
+
+    Rows only hold strings, so volumes can be rendered in other processes;
+    each document makes its own thumbnails at the Word cell size.
+    """
+    coords_texts = block.coords_text()
+    distance_texts = block.distance_text.tolist()
+    rows = []
+    for n, rec in enumerate(records):
+        between_line = f"Between: {get_item_name_short(rec['item1'])} and {rec['item2_name']}\n"
+        clash_details = (f"Clash Group: {rec['test_name']}\n{between_line}{rec['clash_name']}\n"
+                         f"Distance: {distance_texts[n]}m\nClash Point: {coords_texts[n]}")
+        rows.append({
+            "test": rec["test_name"],
+            "cells": [str(rec["rfi_no"]), clash_details, rec["item1"], rec["item2"]],
+            "href": rec["href"],
+            "image": str(rec["img_path"]) if rec["img_path"] else None,
+        })
+    return rows
+
+# ---------- Volumes ----------
+def split_volumes(rows, split_by=None, max_rows=None):
+    """[(label, rows)]: one volume per clash test (split_by="test") and/or at most max_rows rows each."""
+    volumes = [("", rows)]
+    if split_by == "test":
+        by_test = {}
+        for row in rows:
+            by_test.setdefault(row["test"], []).append(row)
+        volumes = list(by_test.items())
+    if max_rows:
+        parts = []
+        for label, vol_rows in volumes:
+            chunks = [vol_rows[n:n + max_rows] for n in range(0, len(vol_rows), max_rows)] or [[]]
+            for k, chunk in enumerate(chunks, start=1):
+                if len(chunks) == 1:
+                    parts.append((label, chunk))
+                elif label:
+                    parts.append((f"{label} (part {k} of {len(chunks)})", chunk))
+                else:
+                    first = (k - 1) * max_rows + 1
+                    parts.append((f"Rows {first}-{first + len(chunk) - 1}", chunk))
+        volumes = parts
+    return volumes
+
+def add_hyperlink(paragraph, target, text):
+    """Append a run linking to target (a file name relative to the document, or a URL)."""
+    r_id = paragraph.part.relate_to(quote(target), RT.HYPERLINK, is_external=True)
+    run = paragraph.add_run(text)
+    run.font.underline = True
+    run.font.color.rgb = RGBColor(0x05, 0x63, 0xC1)
+    link = OxmlElement("w:hyperlink")
+    link.set(qn("r:id"), r_id)
+    run._r.addprevious(link)
+    link.append(run._r)
+    return link
 
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
+def write_index(output_path, report, volumes, summary_rows):
+    """Index document: a linked list of the volumes and the report-wide summary."""
+    doc = new_document()
+    heading = doc.add_paragraph()
+    run = heading.add_run(f"{report} - {len(volumes)} volumes")
+    run.font.size = Pt(HEADER_FONT_SIZE)
+    run.font.bold = True
+    table = doc.add_table(rows=1, cols=len(INDEX_HEADERS))
+    table.autofit = False
+    for i, w in enumerate(INDEX_COL_WIDTHS_CM):
+        table.columns[i].width = Cm(w)
+    add_header_row(table, INDEX_HEADERS)
+    rows = RowBuilder(table)
+    for (label, vol_rows), vol_path in volumes:
+        rfi = f"{vol_rows[0]['cells'][0]} - {vol_rows[-1]['cells'][0]}" if vol_rows else ""
+        cells = rows.add_row(["", label or "All clashes", str(len(vol_rows)), rfi])
+        add_hyperlink(cells[0].paragraphs[0], vol_path.name, vol_path.name)
+    rows.flush()
+    add_summary_table(doc, table, summary_rows)
+    save_document(doc, output_path)
+    print(f"Saved: {output_path}")
 
+# ---------- Main export ----------
+def new_document():
     doc = Document()
     section = doc.sections[-1]
     section.orientation = WD_ORIENT.LANDSCAPE
@@ -134,92 +212,94 @@ def export_to_word(xml_file, output_file):
     section.right_margin = Cm(1)
     section.top_margin = Cm(1)
     section.bottom_margin = Cm(1)
+    return doc
+
+def render_word(rows, output_file, summary_rows=None, title=None):
+    """Write one .docx with the clash table for rows (collect_word_rows dicts)."""
+    doc = new_document()
+    if title:
+        heading = doc.add_paragraph()
+        run = heading.add_run(title)
+        run.font.size = Pt(HEADER_FONT_SIZE)
+        run.font.bold = True
 
-    clashes = root.findall(".//clashresult")
     table = doc.add_table(rows=1, cols=8)
     table.autofit = False
     for i, w in enumerate(COL_WIDTHS_CM):
         table.columns[i].width = Cm(w)
+    add_header_row(table, WORD_HEADERS)
 
-    # Headers
-    headers = ["RFI No.", "Clash Details", "Item 1", "Item 2", "Clash Image", "Solution", "Description of Solution", "TSL comment"]
-    hdr_cells = table.rows[0].cells
-    for i, text in enumerate(headers):
-        p = hdr_cells[i].paragraphs[0]
-        run = p.add_run(text)
-        run.font.name = "Calibri"
-        run.font.size = Pt(HEADER_FONT_SIZE)
-        run.font.bold = True
-        run.font.color.rgb = RGBColor(*HEADER_FONT_COLOR)
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        set_cell_background(hdr_cells[i], HEADER_FILL)
-
-    temp_images = []
-
-    for i, clash in enumerate(clashes, start=1):
-        row_cells = table.add_row().cells
-        row_cells[0].text = str(i)
-
-        # Clash group
-        clash_group = "Unknown Group"
-        clash_guid = clash.get("guid")
-        for test in root.findall(".//clashtest"):
-            for cr in test.findall(".//clashresult"):
-                if clash_guid and cr.get("guid") == clash_guid:
-                    clash_group = test.get("name", "Unknown Group")
-                    break
-            if clash_group != "Unknown Group":
-                break
-
-        # Clash basic
-        clash_name = clash.get("name", f"Clash{i}")
-        distance = clash.get("distance", "N/A")
-        pos = clash.find(".//pos3f")
-        coords_text = ""
-        if pos is not None:
-            x_val = float(pos.get("x") or 0)
-            y_val = float(pos.get("y") or 0)
-            z_val = float(pos.get("z") or 0)
-            coords_text = f"{x_val:.3f}m, {y_val:.3f}m, {z_val:.3f}m"
-
-        # Items
-        objs = clash.findall(".//clashobject")
-        item1_text = get_item_details(objs[0]) if len(objs) > 0 else ""
-        item2_text = get_item_details(objs[1]) if len(objs) > 1 else ""
-        between_line = f"Between: {get_item_name_short(item1_text)} and {get_item_name_short(item2_text)}\n"
-
-        clash_details = f"Clash Group: {clash_group}\n{between_line}{clash_name}\nDistance: {distance}m\nClash Point: {coords_text}"
-        row_cells[1].text = clash_details
-        row_cells[2].text = item1_text
-        row_cells[3].text = item2_text
+    builder = RowBuilder(table)
+    thumbnails = prepare_thumbnails([row["image"] for row in rows], IMG_MAX_W_CM * 96 / 2.54,
+                                    IMG_MAX_H_CM * 96 / 2.54, fmt="PNG")
+    for row, thumbnail in zip(rows, thumbnails):
+        row_cells = builder.add_row(row["cells"])
 
         # Clash image
-        href_raw = clash.get("href") or ""
-        img_path = find_image_file(href_raw, xml_path)
-        if img_path:
-            tmp_img = resize_image_for_cell(img_path, IMG_MAX_W_CM, IMG_MAX_H_CM)
-            if tmp_img:
-                run = row_cells[4].paragraphs[0].add_run()
-                run.add_picture(str(tmp_img), width=Cm(IMG_MAX_W_CM))
-                temp_images.append(tmp_img)
-            else:
-                row_cells[4].text = str(img_path)
+        img_path = row["image"]
+        if thumbnail:
+            run = row_cells[4].paragraphs[0].add_run()
+            run.add_picture(BytesIO(thumbnail), width=Cm(IMG_MAX_W_CM))
         else:
-            row_cells[4].text = href_raw or ""
+            row_cells[4].text = img_path or row["href"]
+    builder.flush()
+
+    if summary_rows is not None:
+        add_summary_table(doc, table, summary_rows)
 
     # Ensure output folder exists
     output_path = Path(output_file)
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    doc.save(output_path)
+    save_document(doc, output_path)
     print(f"Saved: {output_path}")
+    return output_path
+
+def export_to_word(xml_file, output_file, register=None, dedupe=None, where=None, top_k=None, per_test=False,
+                   split_by=None, max_rows=None, workers=None):
+    """Word report; with split_by="test" and/or max_rows, volumes rendered in parallel plus an index document."""
+    xml_path = Path(xml_file)
+    if not xml_path.exists():
+        print(f"XML file not found: {xml_file}")
+        return
+    report = load_report(xml_path, where=where, top_k=top_k, per_test=per_test, dedupe=dedupe, register=register)
+    jobs, finish = plan_word(report, Path(output_file), split_by=split_by, max_rows=max_rows)
+    run_jobs(jobs, workers)
+    finish()
+    return Path(output_file)
+
+def plan_word(report, output_path, split_by=None, max_rows=None, **_):
+    """clash_core renderer plugin for .docx: one job per document (or per volume), index written last."""
+    rows = word_rows_from_records(report["records"], report["block"])
+    return plan_word_output(rows, report["summary_rows"], Path(output_path), report["name"], split_by, max_rows)
+
+def plan_word_output(rows, summary_rows, output_path, report, split_by=None, max_rows=None):
+    """-> ((render_word, args) jobs, finish callback writing the index once the volumes exist)."""
+    volumes = split_volumes(rows, split_by or getattr(config, "WORD_SPLIT_BY", None),
+                            max_rows or getattr(config, "WORD_MAX_ROWS", None))
+    if len(volumes) <= 1:
+        return [(render_word, (rows, output_path, summary_rows, None))], lambda: None
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    vol_paths = [output_path.with_name(f"{output_path.stem} - Vol {n:02d}{output_path.suffix}")
+                 for n in range(1, len(volumes) + 1)]
+    jobs = [(render_word, (vol_rows, vol_path, None,
+                           f"{report} - Volume {n} of {len(volumes)}" + (f": {label}" if label else "")))
+            for n, ((label, vol_rows), vol_path) in enumerate(zip(volumes, vol_paths), start=1)]
+    return jobs, lambda: write_index(output_path, report, list(zip(volumes, vol_paths)), summary_rows)
 
-    # cleanup temp images
-    for t in temp_images:
-        try:
-            os.remove(t)
-        except Exception:
-            pass
+def main():
+    parser = argparse.ArgumentParser(description="Export a Navisworks clash XML to a Word report")
+    parser.add_argument("xml_file", nargs="?", default=config.XML_FILE)
+    parser.add_argument("output_file", nargs="?", default=config.OUTPUT_FILE)
+    add_report_arguments(parser)
+    parser.add_argument("--split-by", choices=["test"], help="one volume per clash test")
+    parser.add_argument("--max-rows", type=int, help="at most this many clashes per volume")
+    parser.add_argument("--workers", type=int, help="processes rendering volumes (default: CPU count)")
+    args = parser.parse_args()
+    export_to_word(args.xml_file, args.output_file, register=args.register, dedupe=args.dedupe, where=args.where,
+                   top_k=args.top_k, per_test=args.per_test, split_by=args.split_by, max_rows=args.max_rows,
+                   workers=args.workers)
 
 # ---------- Run ----------
 if __name__ == "__main__":
-    export_to_word(config.XML_FILE, config.OUTPUT_FILE)
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+python hot_objects.py <report.xml | folder> [output.xlsx] [--workers N] [--top N]
+Ranks the model objects taking part in the most clashes.
+
+ObjectIndex is a hash aggregation keyed by object identity (clash_reader.
+object_key: Item GUID, else Item Name + Network). Each entry keeps the
+object's Item Name / Network / Part Size / Item Type, its clash count, the
+tests and reports it appears in and its worst (most negative) distance,
+in metres.
+
+For a folder, each XML is streamed (clash_reader.iter_clashes) and indexed
+in its own worker process; the per-file indexes are merged in the parent,
+so a whole project folder is processed in one run. The single-report
+exporter fills the same index from its row loop for its "Hot Objects" sheet.
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from clash_reader import iter_clashes, object_key
+from clash_coords import UNIT_SCALE
+
+HOT_SHEET = "Hot Objects"
+HOT_HEADERS = ["Rank", "Item Name", "Network", "Part Size", "Item Type",
+               "Clashes", "Tests", "Reports", "Worst Distance"]
+HOT_COL_WIDTHS = {1: 7, 2: 30, 3: 28, 4: 28, 5: 14, 6: 9, 7: 30, 8: 30, 9: 12}
+HOT_TOP = 100        # rows written to the sheet
+
+
+class ObjectIndex:
+    def __init__(self):
+        # key -> [item name, network, part size, item type, clashes, tests, reports, worst distance]
+        self.entries = {}
+
+    def add(self, objects, test, report="", distance=None):
+        """Count one clash for each of its objects (objects: clash_reader.clash_objects() dicts)."""
+        for key, obj in {object_key(obj): obj for obj in objects}.items():
+            if not key:
+                continue
+            entry = self.entries.get(key)
+            if entry is None:
+                tags = obj["tags"]
+                entry = self.entries[key] = [
+                    tags.get("Item Name", ""), tags.get("Civil3D General:Network name", ""),
+                    tags.get("Civil3D General:Part Size Name", ""), tags.get("Item Type", ""),
+                    0, set(), set(), None]
+            entry[4] += 1
+            entry[5].add(test)
+            if report:
+                entry[6].add(report)
+            if distance is not None and (entry[7] is None or distance < entry[7]):
+                entry[7] = distance
+
+    def merge(self, other):
+        for key, theirs in other.entries.items():
+            mine = self.entries.get(key)
+            if mine is None:
+                self.entries[key] = theirs
+                continue
+            mine[4] += theirs[4]
+            mine[5] |= theirs[5]
+            mine[6] |= theirs[6]
+            if theirs[7] is not None and (mine[7] is None or theirs[7] < mine[7]):
+                mine[7] = theirs[7]
+        return self
+
+    def rows(self, top=HOT_TOP):
+        """HOT_HEADERS rows, most clashes first (ties: worst distance first)."""
+        ranked = sorted(self.entries.values(),
+                        key=lambda e: (-e[4], e[7] if e[7] is not None else 0.0, e[0]))
+        return [[rank, name, network, part, itype, clashes, ", ".join(sorted(tests)), ", ".join(sorted(reports)),
+                 worst]
+                for rank, (name, network, part, itype, clashes, tests, reports, worst)
+                in enumerate(ranked[:top] if top else ranked, start=1)]
+
+
+def index_report(xml_path):
+    """ObjectIndex of one report, streamed."""
+    index = ObjectIndex()
+    report = Path(xml_path).stem
+    for rec in iter_clashes(xml_path):
+        try:
+            distance = float(rec["distance"]) * UNIT_SCALE.get(rec["units"], 1.0)
+        except ValueError:
+            distance = None
+        index.add(rec["objects"], rec["test"], report, distance)
+    return index
+
+
+def index_reports(xml_files, workers=None):
+    """Merged ObjectIndex of several reports, one worker process per file."""
+    xml_files = [str(f) for f in xml_files]
+    merged = ObjectIndex()
+    if len(xml_files) <= 1 or workers == 1:
+        for xml_file in xml_files:
+            merged.merge(index_report(xml_file))
+        return merged
+    workers = min(workers or os.cpu_count() or 1, len(xml_files))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for index in pool.map(index_report, xml_files):
+            merged.merge(index)
+    return merged
+
+
+def write_hot_objects(rows, output_file):
+    from openpyxl import Workbook
+    from export_xml_to_excel_v8 import add_summary_sheet_openpyxl
+    from package_writer import save_workbook
+    wb = Workbook()
+    wb.remove(wb.active)
+    add_summary_sheet_openpyxl(wb, HOT_SHEET, HOT_HEADERS, HOT_COL_WIDTHS, rows)
+    save_workbook(wb, output_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank the objects taking part in the most clashes")
+    parser.add_argument("source", help="clash XML file, or a folder of them")
+    parser.add_argument("output", nargs="?", help="output .xlsx (default: Hot_Objects.xlsx next to the source)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=HOT_TOP, help="rows to write (0 = all)")
+    args = parser.parse_args()
+
+    source = Path(args.source)
+    xml_files = sorted(source.glob("*.xml")) if source.is_dir() else [source]
+    if not xml_files or not all(f.exists() for f in xml_files):
+        print(f"No clash XML found at {source}")
+        return
+    index = index_reports(xml_files, workers=args.workers)
+    rows = index.rows(args.top)
+    output = Path(args.output) if args.output else (source if source.is_dir() else source.parent) / "Hot_Objects.xlsx"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    write_hot_objects(rows, output)
+    print(f"{len(index.entries)} objects in {len(xml_files)} report(s)")
+    for row in rows[:10]:
+        print(f"{row[0]:4d}  {row[5]:4d}  {row[1]}  {row[2]}")
+    print(f"Saved: {output}")
+
+
+if __name__ == "__main__":
+    main()
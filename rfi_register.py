@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+rfi_register.py
+Persistent RFI numbering for a project, stored in a local SQLite file.
+
+Each clash gets an RFI number the first time it is seen and keeps it for
+every later report (keyed by clash guid; the exporter keys clashes without
+one by test + clash name, so no row is left with a positional number), together with the first and last report dates it
+appeared in. Lookups are done in bulk: the report's guids go into a temp
+table and new numbers, last-seen updates and the final lookup are single
+set-based statements on the indexed guid column.
+
+Usage:
+    python rfi_register.py project_register.sqlite      # print a summary
+
+    from rfi_register import RfiRegister
+    with RfiRegister("project_register.sqlite") as reg:
+        numbers = reg.assign(guids, report_date="2025-10-17")
+"""
+
+import datetime
+import sqlite3
+import sys
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rfi (
+    guid       TEXT PRIMARY KEY,
+    rfi_no     INTEGER NOT NULL UNIQUE,
+    first_seen TEXT NOT NULL,
+    last_seen  TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def report_date(xml_path):
+    """Report date used for first/last seen: the XML's modification date (ISO format)."""
+    return datetime.date.fromtimestamp(Path(xml_path).stat().st_mtime).isoformat()
+
+
+class RfiRegister:
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.executescript(SCHEMA)
+
+    def assign(self, guids, report_date):
+        """Return {guid: rfi_no}, numbering unseen guids after the current maximum in input order."""
+        guids = list(dict.fromkeys(g for g in guids if g))
+        with self.conn:
+            cur = self.conn.cursor()
+            cur.execute("CREATE TEMP TABLE IF NOT EXISTS incoming (guid TEXT PRIMARY KEY, pos INTEGER)")
+            cur.execute("DELETE FROM incoming")
+            cur.executemany("INSERT INTO incoming VALUES (?, ?)", ((g, n) for n, g in enumerate(guids)))
+
+            next_no = cur.execute("SELECT COALESCE(MAX(rfi_no), 0) FROM rfi").fetchone()[0] + 1
+            new = [row[0] for row in cur.execute(
+                "SELECT i.guid FROM incoming i LEFT JOIN rfi r ON r.guid = i.guid "
+                "WHERE r.guid IS NULL ORDER BY i.pos")]
+            cur.executemany("INSERT INTO rfi VALUES (?, ?, ?, ?)",
+                            ((g, next_no + n, report_date, report_date) for n, g in enumerate(new)))
+            cur.execute("UPDATE rfi SET last_seen = ? WHERE last_seen < ? AND guid IN (SELECT guid FROM incoming)",
+                        (report_date, report_date))
+            numbers = dict(cur.execute("SELECT r.guid, r.rfi_no FROM rfi r JOIN incoming i ON i.guid = r.guid"))
+            cur.execute("DELETE FROM incoming")
+        return numbers
+
+    def summary(self):
+        count, max_no, first, last = self.conn.execute(
+            "SELECT COUNT(*), MAX(rfi_no), MIN(first_seen), MAX(last_seen) FROM rfi").fetchone()
+        return {"clashes": count, "max_rfi_no": max_no, "first_report": first, "last_report": last}
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python rfi_register.py path/to/register.sqlite")
+        sys.exit(1)
+    with RfiRegister(sys.argv[1]) as reg:
+        for key, value in reg.summary().items():
+            print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()